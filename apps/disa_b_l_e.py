@@ -17,6 +17,7 @@ workaround the "enable" button restarts the watch.
 import wasp
 import widgets
 import ble
+import writeback
 
 class DisaBLEApp():
     NAME = 'DisaBLE'
@@ -54,6 +55,7 @@ class DisaBLEApp():
                 ble.disable()
                 self._draw()
             else:
+                writeback.sync()
                 wasp.machine.reset()
         else:
             self._draw()
@@ -10,19 +10,29 @@ An application that shows images stored in the filesystem.
     :width: 179
 
 The images have to be uploaded in the "gallery" directory.
-The images have to be encoded as BMP RGB565 data in big endian byte order.
-To encode them, you can use GIMP (File → Export, select the BMP format,
-set "R5 G6 B5" in "Advanced Options"), or ImageMagick:
+
+The preferred format is raw RGB565 which can be copied directly to the
+display. Images can be converted using the converter in the tools
+directory (which needs the Python Imaging Library):
 
 .. code-block:: sh
 
-    convert -define bmp:subtype=RGB565 my_image.png my_image.bmp
+    ./tools/rgb565_encode.py my_image.png
 
 And to upload:
 
 .. code-block:: sh
 
-    ./tools/wasptool --binary --upload my_image.bmp --as gallery/my_image
+    ./tools/wasptool --binary --upload my_image.565 --as gallery/my_image
+
+BMP files are also supported, although they are slower to draw. They
+have to be encoded as RGB565 data in big endian byte order. To encode
+them, you can use GIMP (File → Export, select the BMP format, set "R5
+G6 B5" in "Advanced Options"), or ImageMagick:
+
+.. code-block:: sh
+
+    convert -define bmp:subtype=RGB565 my_image.png my_image.bmp
 """
 
 import wasp
@@ -87,7 +97,7 @@ class GalleryApp():
 
     def _invalid_file(self, filename):
         draw = wasp.watch.drawable
-        draw.string('Invalid BMP file', 0, 10, width=240)
+        draw.string('Invalid image file', 0, 10, width=240)
         draw.blit(self.ICON, 72, 72)
         draw.line(72,52, 168,148, 3, 0xf800)
 
@@ -103,57 +113,98 @@ class GalleryApp():
             # so let's put it at the bottom so the user has a chance to see it
             draw.string(filename[:(draw.wrap(filename, 240)[1])], 0, 200)
             file = open("gallery/{}".format(filename), "rb")
-            display = wasp.watch.display
-
-            # check that we are reading a RGB565 BMP
-            magic = file.read(2)
-            if magic != b'BM': # check BMP magic number
-                self._invalid_file(filename)
-                return
-            file.seek(0x0A)
-            data_offset = int.from_bytes(file.read(4), 'little')
-            file.seek(0x0E)
-            dib_len = int.from_bytes(file.read(4), 'little')
-            if dib_len != 124: # check header V5
-                self._invalid_file(filename)
-                return
-            width = int.from_bytes(file.read(4), 'little')
-            height = int.from_bytes(file.read(4), 'little')
-            # width and height are signed, but only height can actually be negative
-            if height >= 2147483648:
-                height = 4294967296 - height
-                bottom_up = False
-            else: bottom_up = True
-            if width > 240 or height > 240: # check size <= 240x240
-                self._invalid_file(filename)
-                return
-            file.seek(0x1C)
-            bit_count = int.from_bytes(file.read(2), 'little')
-            if bit_count != 16: # check 16 bpp
-                self._invalid_file(filename)
-                return
-            compression = int.from_bytes(file.read(4), 'little')
-            if compression != 3: # check bitmask mode
-                self._invalid_file(filename)
-                return
-            file.seek(0x36)
-            bitmask = file.read(4), file.read(4), file.read(4)
-            if bitmask != (b'\x00\xF8\x00\x00', b'\xE0\x07\x00\x00', b'\x1F\x00\x00\x00'): # check bitmask RGB565
-                self._invalid_file(filename)
-                return
 
-            display.set_window((240 - width) // 2, 0, width, height)
-
-            file.seek(data_offset)
+            magic = file.read(4)
+            if magic == b'W565':
+                ok = self._draw_raw(file)
+            elif magic[:2] == b'BM':
+                ok = self._draw_bmp(file)
+            else:
+                ok = False
+            file.close()
 
-            # We don't have enough memory to load the entire image at once, so
-            # we stream it from flash memory to the display
-            buf = display.linebuffer[:2*width]
-            for y in reversed(range(0, height)):
-                if bottom_up: file.seek(data_offset + y * width * 2)
-                file.readinto(buf)
-                for x in range(0, width):
-                    buf[x*2], buf[x*2+1] = buf[x*2+1], buf[x*2]
-                display.write_data(buf)
+            if not ok:
+                self._invalid_file(filename)
 
-            file.close()
+    def _draw_raw(self, file):
+        """Draw a raw RGB565 image (see tools/rgb565_encode.py).
+
+        The pixels are already in the order the display wants them so
+        they are read straight into the line buffer, several rows at a
+        time, and sent unmodified.
+        """
+        display = wasp.watch.display
+        size = file.read(4)
+        if len(size) != 4:
+            return False
+        width = size[0] | (size[1] << 8)
+        height = size[2] | (size[3] << 8)
+        if not width or width > 240 or height > 240:
+            return False
+
+        display.set_window((240 - width) // 2, 0, width, height)
+
+        # The flash and the display can share a bus so we must use
+        # write_data() to release the display between reads.
+        buf = display.linebuffer
+        buf = buf[:len(buf) - (len(buf) % (2 * width))]
+        remaining = 2 * width * height
+        while remaining:
+            n = file.readinto(buf[:min(remaining, len(buf))])
+            if not n:
+                break
+            display.write_data(buf[:n])
+            remaining -= n
+
+        return True
+
+    def _draw_bmp(self, file):
+        """Draw a RGB565 BMP image.
+
+        This is a slow path, each pixel has to be byte swapped before
+        being sent to the display.
+        """
+        display = wasp.watch.display
+
+        file.seek(0x0A)
+        data_offset = int.from_bytes(file.read(4), 'little')
+        file.seek(0x0E)
+        dib_len = int.from_bytes(file.read(4), 'little')
+        if dib_len != 124: # check header V5
+            return False
+        width = int.from_bytes(file.read(4), 'little')
+        height = int.from_bytes(file.read(4), 'little')
+        # width and height are signed, but only height can actually be negative
+        if height >= 2147483648:
+            height = 4294967296 - height
+            bottom_up = False
+        else: bottom_up = True
+        if width > 240 or height > 240: # check size <= 240x240
+            return False
+        file.seek(0x1C)
+        bit_count = int.from_bytes(file.read(2), 'little')
+        if bit_count != 16: # check 16 bpp
+            return False
+        compression = int.from_bytes(file.read(4), 'little')
+        if compression != 3: # check bitmask mode
+            return False
+        file.seek(0x36)
+        bitmask = file.read(4), file.read(4), file.read(4)
+        if bitmask != (b'\x00\xF8\x00\x00', b'\xE0\x07\x00\x00', b'\x1F\x00\x00\x00'): # check bitmask RGB565
+            return False
+
+        display.set_window((240 - width) // 2, 0, width, height)
+
+        file.seek(data_offset)
+
+        # We don't have enough memory to load the entire image at once, so
+        # we stream it from flash memory to the display
+        buf = display.linebuffer[:2*width]
+        for y in reversed(range(0, height)):
+            if bottom_up: file.seek(data_offset + y * width * 2)
+            file.readinto(buf)
+            for x in range(0, width):
+                buf[x*2], buf[x*2+1] = buf[x*2+1], buf[x*2]
+            display.write_data(buf)
+
+        return True
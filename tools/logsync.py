@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+
+# SPDX-License-Identifier: LGPL-3.0-or-later
+# Copyright (C) 2026 agent
+
+"""Receive the logs streamed by wasp/logsync.py.
+
+This is normally used via ``wasptool --sync <dir>`` which copies every
+changed log into ``<dir>`` and then converts them to CSV. The state of
+the sync is kept in ``<dir>/.logsync.json`` so the next sync only fetches
+what has changed (and an interrupted sync carries on where it left off).
+
+The frame format is described in wasp/logsync.py. Frames can also be
+decoded from a file (e.g. a saved console log):
+
+.. code-block:: sh
+
+    ./tools/logsync.py receive console.log logs
+"""
+
+import argparse
+import base64
+import binascii
+import datetime
+import json
+import os
+import struct
+import sys
+
+try:
+    import steplog
+except ImportError:
+    from tools import steplog
+
+STATE = '.logsync.json'
+
+class FrameError(ValueError):
+    pass
+
+def decode(line):
+    """Decode a frame.
+
+    :returns: (kind, offset, payload) tuple or None if the line is not a
+              frame
+    :raises FrameError: If the frame is damaged
+    """
+    line = line.strip()
+    if not line.startswith('#L'):
+        return None
+    try:
+        frame = base64.b64decode(line[2:], validate=True)
+    except binascii.Error as e:
+        raise FrameError(f'bad frame: {e}')
+    if len(frame) < 12:
+        raise FrameError('short frame')
+    (kind, n, offset) = struct.unpack_from('<BxHI', frame)
+    (crc, ) = struct.unpack_from('<I', frame, len(frame) - 4)
+    if len(frame) != 12 + n or binascii.crc32(frame[:-4]) != crc:
+        raise FrameError('bad checksum')
+    return (chr(kind), offset, frame[8:-4])
+
+class Receiver:
+    """Reassemble the log files from a stream of frames.
+
+    :param dest: Directory to write the logs into
+    """
+    def __init__(self, dest):
+        self.dest = dest
+        try:
+            with open(os.path.join(dest, STATE)) as f:
+                self.state = json.load(f)
+        except FileNotFoundError:
+            self.state = {'since': 0, 'files': {}}
+        self.received = 0
+        self.changed = []
+        self.failed = []
+        self._f = None
+
+    @property
+    def since(self):
+        return self.state['since']
+
+    def _path(self, fname):
+        path = os.path.normpath(os.path.join(self.dest, fname))
+        if not path.startswith(os.path.normpath(self.dest) + os.sep):
+            raise FrameError(f'{fname}: bad filename')
+        return path
+
+    def resume(self):
+        """Describe what we already have.
+
+        :returns: Dictionary, indexed by filename, of (offset, crc) tuples
+        """
+        resume = {}
+        for (fname, s) in self.state['files'].items():
+            try:
+                with open(self._path(fname), 'rb') as f:
+                    f.seek(s['header'])
+                    data = f.read(s['offset'] - s['header'])
+            except (OSError, ValueError):
+                continue
+            if len(data) == s['offset'] - s['header']:
+                resume[fname] = (s['offset'], binascii.crc32(data))
+        return resume
+
+    def feed(self, line):
+        """Process a line of output from the watch.
+
+        :returns: True when the sync is complete
+        :raises FrameError: If the frame is damaged (the frames received
+                            so far are kept so the sync can be resumed)
+        """
+        frame = decode(line)
+        if not frame:
+            return False
+        (kind, offset, payload) = frame
+
+        if kind == 'F':
+            self._start(offset, payload)
+        elif kind == 'D':
+            self._data(offset, payload)
+        elif kind == 'E':
+            self._end(offset, payload)
+        elif kind == 'Z':
+            if not self.failed:
+                self.state['since'] = offset
+            return True
+        else:
+            raise FrameError(f'unknown frame type: {kind}')
+        return False
+
+    def _start(self, offset, payload):
+        (size, mtime, header) = struct.unpack_from('<III', payload)
+        fname = payload[12:].decode()
+        path = self._path(fname)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._close()
+        self._f = open(path, 'r+b' if offset and os.path.exists(path) else 'w+b')
+        self._name = fname
+        self._s = self.state['files'].setdefault(fname, {})
+        self._s.update(size=size, mtime=mtime, header=header, offset=offset)
+        self.changed.append(fname)
+
+    def _data(self, offset, data):
+        if not self._f:
+            raise FrameError('data outside of a file')
+        self._f.seek(offset)
+        self._f.write(data)
+        self.received += len(data)
+
+        # Keep track of how much of the file we have (so we can resume)
+        s = self._s
+        if offset <= s['offset']:
+            s['offset'] = max(s['offset'], offset + len(data))
+
+    def _end(self, size, payload):
+        if not self._f:
+            raise FrameError('end outside of a file')
+        self._f.truncate(size)
+        self._f.seek(0)
+        crc = binascii.crc32(self._f.read())
+        if crc != struct.unpack('<I', payload)[0] or self._s['offset'] != size:
+            # Start from scratch next time
+            self._s['offset'] = 0
+            self.failed.append(self._name)
+        self._close()
+
+    def _close(self):
+        if self._f:
+            self._f.close()
+            self._f = None
+
+    def save(self):
+        """Record the state of the sync."""
+        self._close()
+        os.makedirs(self.dest, exist_ok=True)
+        with open(os.path.join(self.dest, STATE), 'w') as f:
+            json.dump(self.state, f, indent=1, sort_keys=True)
+
+def receive(lines, dest):
+    """Process the output from the watch.
+
+    :returns: The receiver (which describes what was received)
+    """
+    rx = Receiver(dest)
+    try:
+        for line in lines:
+            if rx.feed(line):
+                break
+    finally:
+        rx.save()
+    return rx
+
+def hrs_records(data):
+    """Split the heart rate debug log (hrs.data) into records.
+
+    :returns: Iterator of (timestamp, samples) tuples
+    """
+    view = memoryview(data[:len(data) & ~1]).cast('H')
+    offset = 0
+    while offset < len(view):
+        end = offset + 7
+        while end < len(view) and view[end] != 0xffff:
+            end += 1
+        if view[offset] == 0xffff and end - offset >= 7:
+            (YY, MM, DD, hh, mm, ss) = view[offset+1:offset+7]
+            yield (f'{YY:04}{MM:02}{DD:02}T{hh:02}{mm:02}{ss:02}',
+                   list(view[offset+7:end]))
+        offset = end
+
+def export(dest, fnames):
+    """Convert the logs to CSV.
+
+    Each step log (``<yyyy>.steps``, or ``<yyyy>/<mm>-<dd>.steps`` for
+    the old style logs) becomes a CSV file with one row per day: the
+    date, the total and then the samples. Each totals file
+    (``<yyyy>.total``) becomes ``<yyyy>-total.csv`` with one row for
+    each day, week and month that has any steps.
+
+    :returns: List of CSV files written
+    """
+    written = []
+    for fname in fnames:
+        path = os.path.join(dest, fname)
+        base = os.path.basename(fname)
+        if base == 'hrs.data':
+            out = os.path.join(dest, 'hrs.csv')
+            with open(path, 'rb') as f:
+                data = f.read()
+            with open(out, 'w') as f:
+                for (ts, samples) in hrs_records(data):
+                    f.write(','.join([ts] + [str(v) for v in samples]) + '\n')
+        elif fname.count('/') == 1 and base.endswith('.steps'):
+            out = path[:-6] + '.csv'
+            yyyy = int(base[:-6])
+            days = steplog.read(path)
+            with open(out, 'w') as f:
+                for doy in sorted(days):
+                    date = datetime.date(yyyy, 1, 1) + \
+                           datetime.timedelta(doy - 1)
+                    _write_day(f, date, days[doy])
+        elif fname.count('/') == 2 and base.endswith('.steps'):
+            # Old style (one file per day) step log
+            out = path[:-6] + '.csv'
+            yyyy = int(os.path.basename(os.path.dirname(fname)))
+            (mm, dd) = base[:-6].split('-')
+            date = datetime.date(yyyy, int(mm), int(dd))
+            with open(out, 'w') as f:
+                _write_day(f, date, steplog.read_legacy(path))
+        elif fname.count('/') == 1 and base.endswith('.total'):
+            out = path[:-6] + '-total.csv'
+            yyyy = int(base[:-6])
+            (daily, weekly, monthly) = steplog.read_totals(path)
+            with open(out, 'w') as f:
+                for (doy, n) in enumerate(daily):
+                    if n:
+                        date = datetime.date(yyyy, 1, 1) + \
+                               datetime.timedelta(doy)
+                        f.write(f'day,{date},{n}\n')
+                for (week, n) in enumerate(weekly):
+                    if n:
+                        f.write(f'week,{yyyy}-W{week:02d},{n}\n')
+                for (month, n) in enumerate(monthly):
+                    if n:
+                        f.write(f'month,{yyyy}-{month+1:02d},{n}\n')
+        else:
+            continue
+        written.append(out)
+    return written
+
+def _write_day(f, date, samples):
+    f.write(f'{date},{sum(samples)},' +
+            ','.join(str(v) for v in samples) + '\n')
+
+def main():
+    parser = argparse.ArgumentParser(
+            description='Receive logs streamed by wasp-os.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('receive', help='Decode the frames in a file')
+    p.add_argument('file', help='Output from the watch (- for stdin)')
+    p.add_argument('dest', help='Directory to write the logs into')
+    args = parser.parse_args()
+
+    try:
+        if args.file == '-':
+            rx = receive(sys.stdin, args.dest)
+        else:
+            with open(args.file) as f:
+                rx = receive(f, args.dest)
+        for out in export(args.dest, rx.changed):
+            print(out)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
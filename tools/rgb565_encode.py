@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+# SPDX-License-Identifier: LGPL-3.0-or-later
+# Copyright (C) 2026 agent
+
+"""Convert images into the raw RGB565 format used by the gallery.
+
+The format is designed so the watch can copy it straight to the display
+without looking at the pixels:
+
+    +--------+--------+--------+-------------------------------------+
+    | 'W565' | width  | height | pixels                              |
+    | 4 bytes| u16 LE | u16 LE | width * height * 2 bytes, RGB565,   |
+    |        |        |        | big endian, top row first           |
+    +--------+--------+--------+-------------------------------------+
+"""
+
+import argparse
+import os.path
+import struct
+import sys
+from PIL import Image
+
+MAGIC = b'W565'
+
+def encode(image):
+    """Encode a PIL image as raw RGB565.
+
+    :param image: The image to encode
+    :returns:     The encoded image (including the header) as bytes
+    """
+    image = image.convert('RGB')
+    (width, height) = image.size
+
+    out = bytearray(MAGIC)
+    out += struct.pack('<HH', width, height)
+    rgb = image.tobytes()
+    for i in range(0, len(rgb), 3):
+        (r, g, b) = rgb[i:i+3]
+        rgb565 = ((r & 0xf8) << 8) | ((g & 0xfc) << 3) | (b >> 3)
+        out += struct.pack('>H', rgb565)
+    return bytes(out)
+
+def decode(data):
+    """Decode raw RGB565 back into a PIL image (useful for checking).
+
+    :param bytes data: The encoded image
+    :returns:          The decoded image
+    """
+    if data[:4] != MAGIC:
+        raise ValueError('not a raw RGB565 image')
+    (width, height) = struct.unpack('<HH', data[4:8])
+    pixels = struct.unpack(f'>{width*height}H', data[8:8+2*width*height])
+    image = Image.new('RGB', (width, height))
+    image.putdata([((p >> 8) & 0xf8, (p >> 3) & 0xfc, (p << 3) & 0xf8)
+                   for p in pixels])
+    return image
+
+def main():
+    parser = argparse.ArgumentParser(
+            description='Convert images to raw RGB565 for the gallery.')
+    parser.add_argument('files', nargs='+',
+                        help='files to be converted')
+    parser.add_argument('--fit', action='store_true',
+                        help='Shrink images that are larger than 240x240')
+    parser.add_argument('-o', '--output',
+                        help='Output filename (only valid with a single input)')
+    args = parser.parse_args()
+
+    if args.output and len(args.files) != 1:
+        parser.error('--output requires exactly one input file')
+
+    for fname in args.files:
+        image = Image.open(fname)
+        if image.width > 240 or image.height > 240:
+            if not args.fit:
+                print(f'{fname}: {image.width}x{image.height} is too big '
+                      '(maximum 240x240, try --fit)', file=sys.stderr)
+                sys.exit(1)
+            image.thumbnail((240, 240))
+
+        out = args.output
+        if not out:
+            out = os.path.splitext(fname)[0] + '.565'
+        with open(out, 'wb') as f:
+            f.write(encode(image))
+        print(f'{fname} -> {out} ({image.width}x{image.height})')
+
+if __name__ == '__main__':
+    main()
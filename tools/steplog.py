@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+
+# SPDX-License-Identifier: LGPL-3.0-or-later
+# Copyright (C) 2026 agent
+
+"""Read, and migrate to, the wasp-os step log format.
+
+The format is described in wasp/steplogger.py. Copy the logs from the
+watch using ``wasptool --pull logs/2021.steps`` then try:
+
+.. code-block:: sh
+
+    ./tools/steplog.py dump 2021.steps
+
+Older versions of wasp-os stored each day in its own file
+(``logs/<yyyy>/<mm>-<dd>.steps``). Pull these into a local ``logs/``
+directory and convert them using:
+
+.. code-block:: sh
+
+    ./tools/steplog.py migrate logs
+
+Migrating a year removes the matching ``<yyyy>.total`` file so, once the
+logs are copied back, remove it from the watch too and the totals will
+be rebuilt.
+"""
+
+import argparse
+import datetime
+import glob
+import os
+import struct
+import sys
+
+try:
+    import steprecord
+except ImportError:
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 '..', 'wasp'))
+    import steprecord
+
+from steprecord import DUMP_LENGTH, DAY_LENGTH
+
+MAGIC = b'STP1'
+INDEX = 8
+HEADER = INDEX + 4 * 366
+
+# The totals file (logs/<yyyy>.total)
+TOTALS_MAGIC = b'STT1'
+DAILY = 0
+WEEKLY = 366
+MONTHLY = WEEKLY + 54
+TOTALS = MONTHLY + 12
+
+# Set in end whilst the watch is changing the header (see wasp/writeback.py)
+TORN = 0x80000000
+
+def encode(doy, dump, samples):
+    """Encode a dump (DUMP_LENGTH samples) as a record."""
+    return bytes(steprecord.encode(doy, dump, samples))
+
+def decode(data, offset, end):
+    """Decode the records starting at offset.
+
+    :returns: Iterator of (doy, dump, samples) tuples
+    """
+    pos = offset
+    while pos < end:
+        samples = [0] * DAY_LENGTH
+        (doy, dump, pos) = steprecord.decode(data, pos, samples)
+        yield (doy, dump, samples[dump*DUMP_LENGTH:(dump+1)*DUMP_LENGTH])
+
+def read(fname):
+    """Read a step log.
+
+    :returns: Dictionary of DAY_LENGTH samples, indexed by day of the year
+    """
+    with open(fname, 'rb') as f:
+        data = f.read()
+    if data[:4] != MAGIC:
+        raise ValueError(f'{fname}: not a step log')
+    (end, ) = struct.unpack_from('<I', data, 4)
+    end &= ~TORN
+
+    days = {}
+    for (doy, dump, samples) in decode(data, HEADER, min(end, len(data))):
+        day = days.setdefault(doy, [0] * DAY_LENGTH)
+        day[dump*DUMP_LENGTH:(dump+1)*DUMP_LENGTH] = samples
+    return days
+
+def append(fname, doy, samples):
+    """Append a whole day to a step log (creating it if needed).
+
+    Days that already have data in the log are left untouched. A day
+    with fewer than DAY_LENGTH samples is padded with zeros.
+
+    :returns: True if the day was added
+    :raises ValueError: If fname exists but is not a step log
+    """
+    if not os.path.exists(fname):
+        with open(fname, 'wb') as f:
+            f.write(MAGIC + struct.pack('<I', HEADER) + bytes(HEADER - 8))
+
+    with open(fname, 'r+b') as f:
+        if f.read(4) != MAGIC:
+            raise ValueError(f'{fname}: not a step log')
+        (end, ) = struct.unpack('<I', f.read(4))
+        torn = end & TORN
+        end &= ~TORN
+        index = INDEX + 4 * (doy - 1)
+        f.seek(index)
+        if struct.unpack('<I', f.read(4))[0]:
+            return False
+
+        rec = b''
+        samples = (list(samples) + [0] * DAY_LENGTH)[:DAY_LENGTH]
+        for dump in range(DAY_LENGTH // DUMP_LENGTH):
+            chunk = samples[dump*DUMP_LENGTH:(dump+1)*DUMP_LENGTH]
+            if any(chunk):
+                rec += encode(doy, dump, chunk)
+        if not rec:
+            return False
+
+        f.seek(end)
+        f.write(rec)
+        f.seek(index)
+        f.write(struct.pack('<I', end))
+        # Leave the header marked as torn (if it was) so the watch will
+        # still repair it
+        f.seek(4)
+        f.write(struct.pack('<I', (end + len(rec)) | torn))
+    return True
+
+def read_totals(fname):
+    """Read a totals file.
+
+    :returns: (daily, weekly, monthly) tuple of lists of step counts
+    """
+    with open(fname, 'rb') as f:
+        data = f.read()
+    if data[:4] != TOTALS_MAGIC:
+        raise ValueError(f'{fname}: not a totals file')
+    data = data[8:8 + 4 * TOTALS]
+    totals = list(struct.unpack(f'<{len(data) // 4}I', data[:len(data) & ~3]))
+    totals += [0] * (TOTALS - len(totals))
+    return (totals[DAILY:WEEKLY], totals[WEEKLY:MONTHLY],
+            totals[MONTHLY:TOTALS])
+
+def read_legacy(fname):
+    """Read an old style (one file per day) step log."""
+    with open(fname, 'rb') as f:
+        data = f.read()
+    samples = list(struct.unpack(f'<{len(data) // 2}H', data[:len(data) & ~1]))
+    return (samples + [0] * DAY_LENGTH)[:DAY_LENGTH]
+
+def migrate(logdir, delete=False):
+    """Convert old style step logs into the per-year format."""
+    for fname in sorted(glob.glob(os.path.join(logdir, '[0-9]*', '*.steps'))):
+        yyyy = os.path.basename(os.path.dirname(fname))
+        (mm, dd) = os.path.basename(fname)[:-6].split('-')
+        doy = datetime.date(int(yyyy), int(mm), int(dd)).timetuple()[7]
+        log = os.path.join(logdir, f'{yyyy}.steps')
+        if append(log, doy, read_legacy(fname)):
+            print(f'{fname} -> {log}')
+            # The totals are out of date (the watch rebuilds them if
+            # they are missing)
+            total = os.path.join(logdir, f'{yyyy}.total')
+            if os.path.exists(total):
+                os.remove(total)
+            if delete:
+                os.remove(fname)
+        else:
+            print(f'{fname}: skipped (already present or empty)')
+
+def dump(fname, samples=False):
+    yyyy = int(os.path.basename(fname).split('.')[0])
+    days = read(fname)
+    for doy in sorted(days):
+        date = datetime.date(yyyy, 1, 1) + datetime.timedelta(doy - 1)
+        if samples:
+            print(f'{date},' + ','.join(str(v) for v in days[doy]))
+        else:
+            print(f'{date},{sum(days[doy])}')
+
+def main():
+    parser = argparse.ArgumentParser(
+            description='Read or migrate wasp-os step logs.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('dump', help='Print the daily totals as CSV')
+    p.add_argument('file', help='Step log (e.g. 2021.steps)')
+    p.add_argument('--samples', action='store_true',
+                   help='Print every sample rather than the totals')
+    p = sub.add_parser('migrate',
+                   help='Convert old style (one file per day) step logs')
+    p.add_argument('logdir', help='Directory containing the logs')
+    p.add_argument('--delete', action='store_true',
+                   help='Remove the old files once they are converted')
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'dump':
+            dump(args.file, args.samples)
+        else:
+            migrate(args.logdir, args.delete)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -41,12 +41,13 @@ class PagerApp():
                 wasp.system.navigate(wasp.EventType.BACK)
                 return
             self._page += 1
+            self._draw(216)
         else:
             if self._page <= 0:
                 wasp.watch.vibrator.pulse()
                 return
             self._page -= 1
-        self._draw()
+            self._draw(-216)
 
     def _redraw(self):
         """Redraw from scratch (jump to the first page)"""
@@ -55,26 +56,55 @@ class PagerApp():
         self._numpages = (len(self._chunks) - 2) // 9
         self._draw()
 
-    def _draw(self):
-        """Draw a page from scratch."""
+    def _line(self, i):
+        """Get the text for the ith line of the current page."""
+        i += self._page * 9
+        chunks = self._chunks
+        if i + 1 >= len(chunks):
+            return None
+        return self._msg[chunks[i]:chunks[i+1]].rstrip()
+
+    def _draw(self, dy=0):
+        """Draw a page.
+
+        Consecutive pages overlap by one line so, when moving to an
+        adjacent page (dy is +/-216), the display is scrolled and only
+        the newly exposed lines are drawn. Otherwise the page is drawn
+        from scratch.
+        """
         mute = wasp.watch.display.mute
         draw = wasp.watch.drawable
 
         mute(True)
         draw.set_color(0xffff)
-        draw.fill()
-
-        page = self._page
-        i = page * 9
-        j = i + 11
-        chunks = self._chunks[i:j]
-        for i in range(len(chunks)-1):
-            sub = self._msg[chunks[i]:chunks[i+1]].rstrip()
+        if dy:
+            draw.scroll(dy)
+        else:
+            draw.fill()
+
+        if dy > 0:
+            # The last line of the previous page is now at the top of the
+            # display but the old scroll indicator came with it. Rub it out
+            # and repair the text underneath if it extends that far.
+            draw.fill(None, 240-18, 0, 18, 24)
+            sub = self._line(0)
+            if sub and draw.bounding_box(sub)[0] > 240-18:
+                draw.string(sub, 0, 0)
+            lines = range(1, 10)
+        elif dy < 0:
+            lines = range(0, 9)
+        else:
+            lines = range(0, 10)
+
+        for i in lines:
+            sub = self._line(i)
+            if sub is None:
+                break
             draw.string(sub, 0, 24*i)
 
         scroll = self._scroll
-        scroll.up = page > 0
-        scroll.down = page < self._numpages
+        scroll.up = self._page > 0
+        scroll.down = self._page < self._numpages
         scroll.draw()
 
         mute(False)
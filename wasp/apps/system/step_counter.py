@@ -10,15 +10,26 @@ Provide a daily step count.
         :width: 179
 
 The step counts automatically reset at midnight.
+
+Swipe up to look back at the step counts for earlier days. Tap the graph
+to switch between the daily graphs and the weekly and monthly totals
+for a whole year.
 """
 
 import wasp
 
 import fonts
 import icons
+import steplogger
 import time
 import watch
 
+from micropython import const
+
+_DAYS = const(0)
+_WEEKS = const(1)
+_MONTHS = const(2)
+
 # 2-bit RLE, generated from res/feet.png, 240 bytes
 feet = (
     b'\x02'
@@ -49,6 +60,7 @@ class StepCounterApp():
         watch.accel.reset()
         self._scroll = wasp.widgets.ScrollIndicator()
         self._wake = 0
+        self._view = _DAYS
 
     def foreground(self):
         """Cancel the alarm and draw the application.
@@ -64,8 +76,10 @@ class StepCounterApp():
         wasp.system.cancel_alarm(self._wake, self._reset)
         wasp.system.bar.clock = True
         self._page = -1
+        self._view = _DAYS
         self._draw()
-        wasp.system.request_event(wasp.EventMask.SWIPE_UPDOWN)
+        wasp.system.request_event(wasp.EventMask.SWIPE_UPDOWN |
+                                  wasp.EventMask.TOUCH)
         wasp.system.request_tick(1000)
 
     def background(self):
@@ -98,6 +112,18 @@ class StepCounterApp():
         self._draw()
         mute(False)
 
+    def touch(self, event):
+        """Switch between the daily, weekly and monthly views."""
+        if self._page == -1:
+            return
+        self._view = (self._view + 1) % 3
+        self._page = 0
+
+        mute = wasp.watch.display.mute
+        mute(True)
+        self._draw()
+        mute(False)
+
     def tick(self, ticks):
         if self._page == -1:
             self._update()
@@ -136,6 +162,12 @@ class StepCounterApp():
         draw.string(t, 228-w, 132-18)
 
     def _update_graph(self):
+        if self._view == _DAYS:
+            self._update_day()
+        else:
+            self._update_year()
+
+    def _update_day(self):
         draw = watch.drawable
         draw.set_font(fonts.sans24)
         draw.set_color(0xffff)
@@ -147,7 +179,8 @@ class StepCounterApp():
         draw.string('{:02d}-{:02d}'.format(walltime[2], walltime[1]), 0, 0)
 
         # Get the iterable step date for the currently selected date
-        data = wasp.system.steps.data(then)
+        steps = wasp.system.steps
+        data = steps.data(then)
 
         # Bail if there is no data
         if not data:
@@ -162,16 +195,54 @@ class StepCounterApp():
         for i in (0, 60, 90, 120, 150, 180, 239):
             draw.fill(0x3969, i, 39, 1, 201)
 
-        total = 0
         for x, d in enumerate(data):
             if d == 0 or x < 2:
                 # TODO: the x < 2 conceals BUGZ
                 continue
-            total += d
             d = d // 4
             if d > 200:
                 draw.fill(0xffff, x, 239-200, 1, 200)
             else:
                 draw.fill(color, x, 239-d, 1, d)
 
-        draw.string(str(total), 239-160, 0, 160, right=True)
+        total = steps.totals(walltime[0], steplogger.DAILY + walltime[7] - 1)
+        draw.string(str(total[0]), 239-160, 0, 160, right=True)
+
+    def _update_year(self):
+        """Draw the weekly (or monthly) totals for a whole year."""
+        draw = watch.drawable
+        draw.set_font(fonts.sans24)
+        draw.set_color(0xffff)
+
+        yyyy = watch.rtc.get_localtime()[0] - self._page
+        draw.string(('Wk ' if self._view == _WEEKS else 'Mo ') + str(yyyy),
+                    0, 0)
+
+        steps = wasp.system.steps
+        if self._view == _WEEKS:
+            totals = steps.totals(yyyy, steplogger.WEEKLY, 54)
+            w = 4
+        else:
+            totals = steps.totals(yyyy, steplogger.MONTHLY, 12)
+            w = 20
+
+        peak = max(totals)
+        if not peak:
+            draw.string('No data', 239-110, 0, 110, right=True)
+            return
+
+        color = wasp.system.theme('spot2')
+
+        # Draw the frame
+        draw.fill(0x3969, 0, 39, 240, 1)
+        draw.fill(0x3969, 0, 239, 240, 1)
+
+        x = (240 - w * len(totals)) // 2
+        for d in totals:
+            d = d * 199 // peak
+            if d:
+                draw.fill(color, x, 239-d, w-1, d)
+            x += w
+
+        total = sum(totals)
+        draw.string(str(total), 239-110, 0, 110, right=True)
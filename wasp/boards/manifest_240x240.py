@@ -17,6 +17,9 @@ manifest = (
     'fonts/sans36.py',
     'icons.py',
     'widgets.py',
+    'logsync.py',
     'steplogger.py',
+    'steprecord.py',
+    'writeback.py',
     'appregistry.py',
 )
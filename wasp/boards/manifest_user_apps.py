@@ -0,0 +1,14 @@
+# This file is auto generated from the wasp.toml. Manual changes will be overwritten. 
+
+manifest = (
+    'apps/user/stopwatch.py',
+    'apps/user/heart.py',
+    'apps/user/alarm.py',
+    'apps/user/timer.py',
+    'apps/user/calculator.py',
+    'apps/user/disa_b_l_e.py',
+    'apps/user/faces.py',
+    'apps/user/clock.py',
+    'apps/user/week_clock.py',
+    'apps/user/chrono.py',
+)
\ No newline at end of file
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+
+# SPDX-License-Identifier: LGPL-3.0-or-later
+# Copyright (C) 2026 agent
+
+""" Benchmark harness for the simulator.
+
+Runs every bench_ function found in the bench_*.py modules alongside this
+file and reports, for each one, the operations per second achieved on the
+host and the SPI traffic per operation. The results are compared against
+a stored baseline (bench_baseline.json):
+
+* Operations per second depends on the host so it only counts as a
+  regression when it drops by more than the tolerance (25% by default).
+* SPI bytes and transactions per operation are exact so any increase is
+  a regression.
+
+A benchmark may also return a dictionary of its own counters (e.g. the
+number of file reads it made). These are reported per operation and are
+treated in the same way as the SPI counters.
+
+Normally this is run using ``make bench``. Use ``make bench BENCH=--update``
+to record a new baseline.
+"""
+
+import argparse
+import glob
+import importlib
+import json
+import os
+import sys
+import time
+
+# The harness uses the headless display backend unless asked otherwise
+os.environ.setdefault('WASP_SIM_HEADLESS', '1')
+
+import wasp
+import watch
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        'bench_baseline.json')
+
+# Operations used to count the bytes per operation
+COUNT_OPS = 4
+
+# Number of timing rounds for each benchmark
+ROUNDS = 5
+
+def discover(pattern=None):
+    """Find the benchmarks.
+
+    :param str pattern: Only return benchmarks whose name contains pattern
+    :returns: List of (name, function) tuples
+    """
+    benchmarks = []
+    d = os.path.dirname(os.path.abspath(__file__))
+    for fname in sorted(glob.glob(os.path.join(d, 'bench_*.py'))):
+        m = importlib.import_module(os.path.basename(fname)[:-3])
+        for sym in sorted(m.__dict__.keys()):
+            if not sym.startswith('bench_'):
+                continue
+            name = '{}.{}'.format(m.__name__[6:], sym[6:])
+            if pattern and pattern not in name:
+                continue
+            benchmarks.append((name, m.__dict__[sym]))
+    return benchmarks
+
+def run(fn, min_time=0.5, draw=None):
+    """Run a benchmark.
+
+    The benchmark is run once to warm up, then COUNT_OPS times to count
+    the SPI traffic and then for (at least) min_time seconds to measure
+    its speed.
+
+    :param fn:             The benchmark to run
+    :param float min_time: Time to spend measuring the speed, in seconds
+    :param draw:           Drawing surface (defaults to watch.drawable)
+
+    :returns: Dictionary of results
+    """
+    if not draw:
+        draw = watch.drawable
+    spi = watch.spi
+    draw.reset()
+    draw.fill()
+    fn(draw)
+
+    spi.reset_counters()
+    counters = {}
+    for i in range(COUNT_OPS):
+        extra = fn(draw)
+        if extra:
+            for (k, v) in extra.items():
+                counters[k] = counters.get(k, 0) + v
+    results = {
+        'spi_bytes': spi.bytes // COUNT_OPS,
+        'spi_transactions': spi.transactions // COUNT_OPS,
+    }
+    for (k, v) in counters.items():
+        results[k] = v // COUNT_OPS
+
+    # Host timings are noisy so split the time into several rounds and
+    # report the best of them
+    best = 0
+    for i in range(ROUNDS):
+        ops = 0
+        start = time.process_time()
+        while True:
+            fn(draw)
+            ops += 1
+            elapsed = time.process_time() - start
+            if elapsed >= min_time / ROUNDS:
+                break
+        best = max(best, ops / elapsed)
+    results['ops_per_sec'] = round(best, 1)
+
+    return results
+
+def exact(results):
+    """Find the counters that are exact (i.e. everything except the speed)."""
+    return sorted(k for k in results if k != 'ops_per_sec')
+
+def compare(results, baseline, tolerance=0.25):
+    """Compare a set of results against the baseline.
+
+    :returns: List of regressions (as human readable strings)
+    """
+    regressions = []
+    for (name, r) in results.items():
+        b = baseline.get(name)
+        if not b:
+            continue
+        for k in exact(r):
+            if k in b and r[k] > b[k]:
+                regressions.append('{}: {} increased from {} to {}'.format(
+                        name, k, b[k], r[k]))
+        if r['ops_per_sec'] < b['ops_per_sec'] * (1 - tolerance):
+            regressions.append('{}: ops/sec dropped from {} to {}'.format(
+                    name, b['ops_per_sec'], r['ops_per_sec']))
+    return regressions
+
+def load_baseline(fname=BASELINE):
+    try:
+        with open(fname) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def main():
+    parser = argparse.ArgumentParser(
+            description='Run the simulator benchmarks.')
+    parser.add_argument('-k', dest='pattern',
+                        help='Only run benchmarks whose name contains PATTERN')
+    parser.add_argument('--baseline', default=BASELINE,
+                        help='Baseline file (default: %(default)s)')
+    parser.add_argument('--min-time', type=float, default=0.5,
+                        help='Seconds to spend running each benchmark')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Acceptable drop in ops/sec (default: %(default)s)')
+    parser.add_argument('--update', action='store_true',
+                        help='Record the results as the new baseline')
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.baseline)
+    results = {}
+    print('{:24} {:>10} {:>10} {:>8}'.format(
+            'benchmark', 'ops/sec', 'bytes/op', 'xfers/op'))
+    for (name, fn) in discover(args.pattern):
+        r = run(fn, args.min_time)
+        results[name] = r
+        b = baseline.get(name)
+        change = ''
+        if b:
+            change = '({:+.0%})'.format(r['ops_per_sec'] / b['ops_per_sec'] - 1)
+        extra = ' '.join('{}={}'.format(k, r[k]) for k in exact(r)
+                                        if not k.startswith('spi_'))
+        print('{:24} {:>10} {:>10} {:>8} {} {}'.format(name, r['ops_per_sec'],
+                r['spi_bytes'], r['spi_transactions'], change, extra))
+
+    if args.update:
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=4, sort_keys=True)
+            f.write('\n')
+        print('Baseline updated')
+        return
+
+    regressions = compare(results, baseline, args.tolerance)
+    for r in regressions:
+        print(r)
+    if regressions:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# SPDX-License-Identifier: LGPL-3.0-or-later
+# Copyright (C) 2026 agent
+
+""" Rendering benchmarks for draw565.
+
+These drive the same drawing paths as the benchmarks in the self test app
+(apps/test.py). Each bench_ function performs one operation; bench.py
+takes care of timing them and counting the bytes sent to the display.
+"""
+
+import draw565
+import fonts
+import icons
+
+def bench_fill(draw):
+    draw.fill(0xffff, 60, 60, 120, 120)
+
+def bench_fill_h(draw):
+    for i in range(60, 180, 2):
+        draw.fill(0xffff, 60, i, 120, 1)
+
+def bench_fill_v(draw):
+    for i in range(60, 180, 2):
+        draw.fill(0xffff, i, 60, 1, 120)
+
+def bench_rle(draw):
+    for i in range(0, 128, 16):
+        draw.blit(icons.software, i+16, i+32)
+
+def bench_string(draw):
+    draw.set_color(0xffff, 0x4208)
+    draw.string("The quick brown", 12, 24+24)
+    draw.string("fox jumped over", 12, 24+48)
+    draw.string("the lazy dog.", 12, 24+72)
+    draw.string("0123456789", 12, 24+120, width=228)
+    draw.string('!"£$%^&*()', 12, 24+144, width=228)
+    draw.reset()
+
+def bench_string_large(draw):
+    draw.set_font(fonts.sans36)
+    draw.string("12:34", 0, 108, width=240)
+    draw.reset()
+
+def bench_wrap(draw):
+    s = 'This\nis a very long string that will need to be wrappedinmultipledifferentways!'
+    chunks = draw.wrap(s, 240)
+    for i in range(len(chunks)-1):
+        sub = s[chunks[i]:chunks[i+1]].rstrip()
+        draw.string(sub, 0, 48+24*i)
+
+def bench_line(draw):
+    points = (0, 50), (19, 46), (35, 35), (46, 19),
+    for x, y in points:
+        draw.line(120, 120, 120+x, 120+y, 4, 0xfb00)  # red
+        draw.line(120, 120, 120+y, 120-x, 3, 0x07c0)  # green
+        draw.line(120, 120, 120-x, 120-y, 5, 0x6b3f)  # blue
+        draw.line(120, 120, 120-y, 120+x, 2, 0xffe0)  # yellow
+
+_comp = None
+_frame = 0
+
+def bench_compositor(draw):
+    # An (almost) static frame: only the seconds change (between two values
+    # so every frame costs the same)
+    global _comp, _frame
+    if not _comp or _comp._draw is not draw:
+        _comp = draw565.Compositor(draw)
+    _frame += 1
+    _comp.fill()
+    _comp.blit(icons.app, 20, 20)
+    _comp.string('12:34', 0, 108, width=240)
+    _comp.string(('58', '59')[_frame & 1], 0, 160, width=240)
+    _comp.flush()
@@ -0,0 +1,72 @@
+# SPDX-License-Identifier: LGPL-3.0-or-later
+# Copyright (C) 2026 agent
+
+""" File access benchmarks for the step logger.
+
+The step logger reads its files using the builtin open(). These
+benchmarks replace it with a version that counts the calls made to
+read() and readinto() (``read_calls``) and, of those, the calls to read()
+(``read_copies``) because each of them returns a newly allocated copy of
+the data. Buffers that the step logger allocates for itself are not
+counted.
+"""
+
+import array
+import os
+import tempfile
+
+import steplogger
+
+_dir = tempfile.TemporaryDirectory()
+_legacy = os.path.join(_dir.name, '01-01.steps')
+with open(_legacy, 'wb') as f:
+    f.write(array.array('H', range(200)))
+
+_counters = {}
+
+class _File:
+    def __init__(self, f):
+        self._f = f
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+    def read(self, *args):
+        _counters['read_calls'] += 1
+        _counters['read_copies'] += 1
+        return self._f.read(*args)
+
+    def readinto(self, buf):
+        _counters['read_calls'] += 1
+        return self._f.readinto(buf)
+
+def _open(*args):
+    return _File(open(*args))
+
+def _counting(fn):
+    for k in ('read_calls', 'read_copies'):
+        _counters[k] = 0
+    steplogger.open = _open
+    try:
+        fn()
+    finally:
+        del steplogger.open
+    return dict(_counters)
+
+def bench_legacy_day(draw):
+    # Graph a day stored in the old (one file per day) format, including
+    # the latest (not yet written) samples
+    latest = array.array('H', range(steplogger.DUMP_LENGTH))
+
+    def graph():
+        total = 0
+        for d in steplogger.StepIterator(_legacy, latest):
+            total += d
+
+    return _counting(graph)
@@ -0,0 +1,142 @@
+# SPDX-License-Identifier: LGPL-3.0-or-later
+# Copyright (C) 2026 agent
+
+""" Bus traffic profiler for the simulator.
+
+The simulated SPI and I2C controllers report every transaction to the
+profiler which attributes it to the current application (by NAME) and to
+the current frame. A frame ends each time the system goes to sleep in
+machine.lightsleep() (i.e. once per pass through the main loop).
+
+Profiling is disabled by default. Set WASP_SIM_PROFILE to the name of a
+.csv or .json file to profile an interactive simulator session and write
+a report at exit:
+
+.. code-block:: sh
+
+    WASP_SIM_PROFILE=bus.csv make sim
+
+Tests can use the ``bus_profile`` fixture (see conftest.py) instead.
+"""
+
+import atexit
+import csv
+import json
+import os
+
+# Command opcode used by ST7789.set_window() (CASET)
+_SET_WINDOW = 0x2a
+
+# Per-frame counters, in the order they appear in the reports
+FIELDS = ('spi_bytes', 'spi_transactions', 'set_window', 'spi_us',
+          'i2c_bytes', 'i2c_transactions', 'i2c_us')
+
+class BusProfiler(object):
+    def __init__(self):
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        """Discard everything recorded so far."""
+        self.frame = 0
+        self.records = {}
+
+    def _record(self):
+        """Find the counters for the current app in the current frame."""
+        import wasp
+        name = getattr(wasp.system.app, 'NAME', '-')
+        key = (self.frame, name)
+        rec = self.records.get(key)
+        if rec is None:
+            rec = dict.fromkeys(FIELDS, 0)
+            self.records[key] = rec
+        return rec
+
+    def spi_write(self, spi, buf):
+        """Account for an SPI write."""
+        if not self.enabled:
+            return
+        rec = self._record()
+        n = len(buf)
+        rec['spi_bytes'] += n
+        rec['spi_transactions'] += 1
+        rec['spi_us'] += n * 8 * 1000000 / spi.baudrate
+        if n == 1 and buf[0] == _SET_WINDOW:
+            rec['set_window'] += 1
+
+    def i2c_transfer(self, i2c, n):
+        """Account for an I2C register read or write of n bytes."""
+        if not self.enabled:
+            return
+        rec = self._record()
+        rec['i2c_bytes'] += n
+        rec['i2c_transactions'] += 1
+        # Address and register bytes, plus an ACK bit for every byte
+        rec['i2c_us'] += (n + 2) * 9 * 1000000 / i2c.freq
+
+    def end_frame(self):
+        """Start a new frame."""
+        if self.enabled:
+            self.frame += 1
+
+    def frames(self, name=None):
+        """Get the per-frame records.
+
+        Frames without any bus traffic are not recorded.
+
+        :param str name: Only report frames for the named application
+        :returns: List of (frame, app, counters) tuples
+        """
+        return [(f, n, rec) for ((f, n), rec) in sorted(self.records.items())
+                    if name is None or n == name]
+
+    def summary(self):
+        """Summarise the records by application.
+
+        :returns: Dictionary, indexed by application name, containing the
+                  number of frames with bus traffic and the total and worst case (max) for
+                  each counter
+        """
+        summary = {}
+        for (f, name, rec) in self.frames():
+            s = summary.get(name)
+            if s is None:
+                s = {'frames': 0}
+                for field in FIELDS:
+                    s[field] = 0
+                    s['max_' + field] = 0
+                summary[name] = s
+            s['frames'] += 1
+            for field in FIELDS:
+                s[field] += rec[field]
+                s['max_' + field] = max(s['max_' + field], rec[field])
+        return summary
+
+    def write_csv(self, fname):
+        """Write the per-frame records as CSV."""
+        with open(fname, 'w', newline='') as f:
+            w = csv.writer(f)
+            w.writerow(('frame', 'app') + FIELDS)
+            for (frame, name, rec) in self.frames():
+                w.writerow([frame, name] + [round(rec[k], 1) for k in FIELDS])
+
+    def write_json(self, fname):
+        """Write the per-application summary, and the frames, as JSON."""
+        frames = [dict(frame=f, app=n, **rec) for (f, n, rec) in self.frames()]
+        with open(fname, 'w') as f:
+            json.dump({'summary': self.summary(), 'frames': frames}, f,
+                      indent=1)
+
+    def write(self, fname):
+        """Write a report, choosing the format from the file extension."""
+        if fname.endswith('.json'):
+            self.write_json(fname)
+        else:
+            self.write_csv(fname)
+
+profiler = BusProfiler()
+
+_report = os.environ.get('WASP_SIM_PROFILE')
+if _report:
+    profiler.enabled = True
+    atexit.register(profiler.write, _report)
@@ -4,6 +4,11 @@ import inspect
 import pytest
 import pprint
 import json
+import simclock
+
+# Run the tests in virtual time so that sleeping (and waiting for alarms)
+# is instant
+simclock.clock.use_virtual_time()
 
 def discover_app_constructors():
     apps = []
@@ -31,3 +36,18 @@ def discover_app_constructors():
 def pytest_generate_tests(metafunc):
     if 'constructor' in metafunc.fixturenames:
          metafunc.parametrize('constructor', discover_app_constructors())
+
+@pytest.fixture
+def bus_profile():
+    """Profile the bus traffic generated by a test.
+
+    Yields the (freshly reset) :py:data:`busprof.profiler` and disables it
+    again when the test finishes.
+    """
+    import busprof
+    profiler = busprof.profiler
+    enabled = profiler.enabled
+    profiler.enabled = True
+    profiler.reset()
+    yield profiler
+    profiler.enabled = enabled
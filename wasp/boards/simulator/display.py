@@ -1,26 +1,38 @@
 # SPDX-License-Identifier: LGPL-3.0-or-later
 # Copyright (C) 2020 Daniel Thompson
 
-""" Simulated ST7789 display and CST816S touchscreen. """
+""" Simulated ST7789 display and CST816S touchscreen.
+
+Setting WASP_SIM_HEADLESS=1 in the environment selects a headless backend
+that keeps the framebuffer in memory and never initializes SDL.
+"""
 
 import warnings
 warnings.simplefilter("ignore", lineno=58)
 
+import os
 import sys
-import sdl2
-import sdl2.ext
+import time
 import numpy as np
 from PIL import Image
 import wasp
 
+HEADLESS = os.environ.get('WASP_SIM_HEADLESS', '0') not in ('', '0')
+if not HEADLESS:
+    import sdl2
+    import sdl2.ext
+
 DISPOFF = 0x28
 DISPON = 0x29
 CASET = 0x2a
 RASET = 0x2b
 RAMWR = 0x2c
+VSCRDEF = 0x33
+VSCSAD = 0x37
 
 WIDTH = 240
 HEIGHT = 240
+RAM_HEIGHT = 320
 
 SKIN = {
     'fname' : 'res/simulator_skin.png',
@@ -30,6 +42,9 @@ SKIN = {
 }
 
 class ST7789Sim(object):
+    # Limit window updates to roughly the display refresh rate
+    REFRESH_INTERVAL = 1 / 60
+
     def __init__(self):
 
         self.x = 0
@@ -39,6 +54,59 @@ class ST7789Sim(object):
         self.cmd = 0
         self.mute = False
 
+        # Display RAM (in RGB565 format) and the vertical scrolling
+        # registers. The RAM has a spare column to soak up writes that
+        # fall just off the right hand edge of the display.
+        self.ram = np.zeros((RAM_HEIGHT, WIDTH+1), dtype=np.uint16)
+        self.tfa = 0
+        self.vsa = RAM_HEIGHT
+        self.vsp = 0
+        self._rows = None
+
+        self.dirty = False
+        self.last_refresh = 0
+
+    def ram_row(self, row):
+        """Find the row of display RAM that is shown at a given row."""
+        if self.tfa <= row < self.tfa + self.vsa:
+            return self.tfa + (row - self.tfa + self.vsp - self.tfa) % self.vsa
+        return row
+
+    def screen(self):
+        """Get a copy of the visible pixels as RGB565, indexed as [y][x]."""
+        if self._rows is None:
+            self._rows = np.array([self.ram_row(y) for y in range(HEIGHT)])
+        return self.ram[self._rows, :WIDTH]
+
+    def rgb888(self):
+        """Get the visible pixels as RGB888, indexed as [y][x]."""
+        p = self.screen().astype(np.uint32)
+        return (((p & 0xf800) << 8) |
+                ((p & 0x07e0) << 5) |
+                ((p & 0x001f) << 3))
+
+    def refresh(self, force=False):
+        """Copy the framebuffer to the window (if anything has changed).
+
+        Unless forced this does nothing if the window was refreshed less
+        than REFRESH_INTERVAL seconds ago.
+        """
+        if not self.dirty or self.mute or HEADLESS:
+            return
+        now = time.monotonic()
+        if not force and now - self.last_refresh < self.REFRESH_INTERVAL:
+            return
+
+        pixelview = sdl2.ext.pixels2d(windowsurface)
+        (ax, ay) = SKIN['adjust']
+        pixelview[ax:ax+WIDTH, ay:ay+HEIGHT] = self.rgb888().T
+        # Forcibly release the surface to ensure it is unlocked
+        del pixelview
+        window.refresh()
+
+        self.dirty = False
+        self.last_refresh = now
+
     def write(self, data):
         # Converting data to a memoryview ensures we act more like spi.write()
         # when running in a real device (e.g. data must be  bytes-like object
@@ -54,7 +122,7 @@ class ST7789Sim(object):
                 self.mute = True
             elif cmd == DISPON:
                 self.mute = False
-                window.refresh()
+                self.refresh(force=True)
             else:
                 self.cmd = data[0]
 
@@ -67,46 +135,71 @@ class ST7789Sim(object):
 
         elif self.cmd == RASET:
             self.rowclip[0] = (data[0] << 8) + data[1]
-            assert(self.rowclip[0] >= 0 and self.rowclip[0] <= 240)
+            assert(self.rowclip[0] >= 0 and self.rowclip[0] < RAM_HEIGHT)
             self.rowclip[1] = (data[2] << 8) + data[3]
-            assert(self.rowclip[1] >= 0 and self.rowclip[1] <= 240)
+            assert(self.rowclip[1] >= self.rowclip[0] and
+                   self.rowclip[1] < RAM_HEIGHT)
             self.y = self.rowclip[0]
 
+        elif self.cmd == VSCRDEF:
+            self.tfa = (data[0] << 8) + data[1]
+            self.vsa = (data[2] << 8) + data[3]
+            bfa = (data[4] << 8) + data[5]
+            assert(self.tfa + self.vsa + bfa == RAM_HEIGHT)
+            self._rows = None
+
+        elif self.cmd == VSCSAD:
+            self.vsp = (data[0] << 8) + data[1]
+            assert(self.vsp >= self.tfa and self.vsp < self.tfa + self.vsa)
+            self._rows = None
+            self.dirty = True
+            self.refresh()
+
         elif self.cmd == RAMWR:
-            #pixelview = sdl2.ext.PixelView(windowsurface)
-            pixelview = sdl2.ext.pixels2d(windowsurface)
-
-            half = False
-            for d in data:
-                if not half:
-                    rgb = d << 8
-                    half = True
+            self.ramwr(np.frombuffer(data, dtype='>u2'))
+            self.dirty = True
+            self.refresh()
+
+    def ramwr(self, pixels):
+        """Scatter pixels into the current window.
+
+        The pixels are written a slice at a time: first any partial row
+        needed to reach the left-hand edge of the window, then as many
+        whole rows as possible and, finally, what is left over.
+        """
+        (c0, c1) = self.colclip
+        (r0, r1) = self.rowclip
+        # An inverted window behaves as if it were a single column wide
+        c1 = max(c0, c1)
+        w = c1 - c0 + 1
+        ram = self.ram
+        x = self.x
+        y = self.y
+        i = 0
+        n = len(pixels)
+
+        while i < n:
+            if x == c0 and n - i >= w:
+                rows = min((n - i) // w, r1 - y + 1)
+                ram[y:y+rows, c0:c1+1] = \
+                        pixels[i:i+rows*w].reshape((rows, w))
+                i += rows * w
+                y += rows
+            else:
+                count = min(c1 - x + 1, n - i)
+                ram[y, x:x+count] = pixels[i:i+count]
+                i += count
+                x += count
+                if x <= c1:
                     continue
-                rgb |= d
-                half = False
-
-                #pixel = ((rgb & 0xf800) >> 8,
-                #         (rgb & 0x07e0) >> 3,
-                #         (rgb & 0x001f) << 3)
-                pixel = (((rgb & 0xf800) << 8) +
-                         ((rgb & 0x07e0) << 5) +
-                         ((rgb & 0x001f) << 3))
-            
-                pv_x = self.x + SKIN['adjust'][0]
-                pv_y = self.y + SKIN['adjust'][1]
-                pixelview[pv_x][pv_y] = pixel
-
-                self.x += 1
-                if self.x > self.colclip[1]:
-                    self.x = self.colclip[0]
-                    self.y += 1
-                if self.y > self.rowclip[1]:
-                    self.y = self.rowclip[0]
-            
-            # Forcibly release the surface to ensure it is unlocked
-            del pixelview
-            if not self.mute:
-                window.refresh()
+                y += 1
+
+            x = c0
+            if y > r1:
+                y = r0
+
+        self.x = x
+        self.y = y
 
 class CST816SSim():
     def __init__(self):
@@ -197,7 +290,7 @@ class CST816SSim():
 
     def swipe(self, direction):
         pins = wasp.watch.Pin.pins
-        if direction ==' up':
+        if direction == 'up':
             self.regs[1] = 1
         elif direction == 'down':
             self.regs[1] = 2
@@ -211,6 +304,21 @@ class CST816SSim():
         self.regs[3] = 0x80
         self.raise_interrupt(pins)
 
+    def burst(self, events):
+        """Inject several events back-to-back.
+
+        This simulates touches arriving faster than the system can handle
+        them (for example during a slow redraw).
+
+        :param events: Sequence of events. Each one is either a direction
+                       accepted by swipe() or an (x, y) tuple for a tap.
+        """
+        for event in events:
+            if isinstance(event, str):
+                self.swipe(event)
+            else:
+                self.press(*event)
+
     def raise_interrupt(self, pins):
         pins['TP_INT'].raise_irq()
 
@@ -224,23 +332,53 @@ SKIN['window'] = (SKIN['size'][0] + SKIN['left_pad'] + SKIN['right_pad'],
 SKIN['adjust'] = (SKIN['offset'][0] + SKIN['left_pad'],
                   SKIN['offset'][1] + SKIN['top_pad'])
 
-sdl2.ext.init()
-window = sdl2.ext.Window("ST7789", size=SKIN['window'])
-window.show()
-windowsurface = window.get_surface()
-sdl2.ext.fill(windowsurface, (0xff, 0xff, 0xff))
-skin = sdl2.ext.load_image(SKIN['fname'])
-sdl2.SDL_BlitSurface(skin, None, windowsurface, sdl2.SDL_Rect(
-        SKIN['left_pad'], SKIN['top_pad'], SKIN['size'][0], SKIN['size'][1]))
-sdl2.SDL_FreeSurface(skin)
-window.refresh()
+if HEADLESS:
+    window = None
+    windowsurface = None
+else:
+    sdl2.ext.init()
+    window = sdl2.ext.Window("ST7789", size=SKIN['window'])
+    window.show()
+    windowsurface = window.get_surface()
+    sdl2.ext.fill(windowsurface, (0xff, 0xff, 0xff))
+    skin = sdl2.ext.load_image(SKIN['fname'])
+    sdl2.SDL_BlitSurface(skin, None, windowsurface, sdl2.SDL_Rect(
+            SKIN['left_pad'], SKIN['top_pad'], SKIN['size'][0], SKIN['size'][1]))
+    sdl2.SDL_FreeSurface(skin)
+    window.refresh()
 
 spi_st7789_sim = ST7789Sim()
 i2c_cst816s_sim = CST816SSim()
 
+def compose_window():
+    """Render the skin and the display as the SDL window would show them.
+
+    :returns: The window pixels, in RGB888 format, indexed as [x][y] (to
+              match sdl2.ext.pixels2d())
+    """
+    image = Image.new('RGB', SKIN['window'], (0xff, 0xff, 0xff))
+    skin = Image.open(SKIN['fname']).convert('RGBA')
+    image.paste(skin, (SKIN['left_pad'], SKIN['top_pad']), skin)
+
+    a = np.asarray(image).astype(np.uint32)
+    raw = (a[:, :, 0] << 16) | (a[:, :, 1] << 8) | a[:, :, 2]
+    raw = np.ascontiguousarray(raw.T)
+
+    (ax, ay) = SKIN['adjust']
+    raw[ax:ax+WIDTH, ay:ay+HEIGHT] = spi_st7789_sim.rgb888().T
+    return raw
+
 def save_image(surface, fname):
-    """Save a surface as an image."""
-    raw = sdl2.ext.pixels2d(surface)
+    """Save a surface as an image.
+
+    If surface is None (e.g. when running headless) then the image is
+    composed from the skin and the framebuffer instead.
+    """
+    if surface is None:
+        raw = compose_window()
+    else:
+        spi_st7789_sim.refresh(force=True)
+        raw = sdl2.ext.pixels2d(surface)
 
     # Crop and swap the axes to ensure the final rotation is correct
     cropped = raw[SKIN['top_pad']:-SKIN['bottom_pad']]
@@ -259,6 +397,10 @@ def save_image(surface, fname):
     Image.fromarray(rgb).save(fname)
 
 def tick(pins):
+    if HEADLESS:
+        return
+    spi_st7789_sim.refresh()
+
     events = sdl2.ext.get_events()
     for event in events:
         if event.type == sdl2.SDL_QUIT:
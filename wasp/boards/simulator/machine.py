@@ -1,8 +1,9 @@
 # SPDX-License-Identifier: LGPL-3.0-or-later
 # Copyright (C) 2020 Daniel Thompson
 
+import busprof
 import display
-import time
+import simclock
 
 class Tracer(object):
     def __init__(self, *args, **kwargs):
@@ -73,31 +74,44 @@ class SPI(object):
             self.sim = display.spi_st7789_sim
         else:
             self.sim = None
+        self.baudrate = 1000000
+        self.reset_counters()
 
     def init(self, baudrate=1000000,  polarity=0, phase=0, bits=8, sck=None, mosi=None, miso=None):
-        pass
+        self.baudrate = baudrate
+
+    def reset_counters(self):
+        """Zero the transaction and byte counters."""
+        self.transactions = 0
+        self.bytes = 0
 
     def write(self, buf):
+        self.transactions += 1
+        self.bytes += len(buf)
+        busprof.profiler.spi_write(self, buf)
         if self.sim:
             self.sim.write(buf)
         else:
             print("Sending data: " + str(buf))
 
 class I2C():
-    def __init__(self, id):
+    def __init__(self, id, freq=400000):
         self.id = id
+        self.freq = freq
         if id == 0:
             self.sim = display.i2c_cst816s_sim
         else:
             self.sim = None
 
     def readfrom_mem_into(self, addr, reg, dbuf):
+        busprof.profiler.i2c_transfer(self, len(dbuf))
         if self.sim:
             self.sim.readfrom_mem_into(addr, reg, dbuf, Pin.pins)
         else:
             raise OSError
 
     def writeto_mem(self, addr, reg, dbuf):
+        busprof.profiler.i2c_transfer(self, len(dbuf))
         if self.sim:
             self.sim.writeto_mem(addr, reg, dbuf, Pin.pins)
         else:
@@ -109,13 +123,14 @@ class Timer():
         self.period = period
 
     def start(self):
-        self.then = time.time()
+        self.then = simclock.clock.time()
 
     def stop(self):
         self.then = None
 
     def time(self):
-        now = time.time()
+        simclock.clock.poll()
+        now = simclock.clock.time()
         elapsed_sec = now - self.then
         elapsed_us = int(elapsed_sec * 1000000)
 
@@ -125,8 +140,15 @@ class Timer():
         self.time()
 
 def lightsleep(ms=10):
+    busprof.profiler.end_frame()
     display.tick(Pin.pins)
-    time.sleep(ms / 1000)
+
+    # Wake up early if a timer is due
+    import wasp
+    deadline = wasp.system.next_deadline()
+    if deadline is not None and deadline < ms:
+        ms = deadline
+    simclock.clock.sleep(ms / 1000)
 
 def deepsleep(ms=10):
     lightsleep(ms)
@@ -0,0 +1,125 @@
+# SPDX-License-Identifier: LGPL-3.0-or-later
+# Copyright (C) 2026 agent
+
+""" Simulated clock.
+
+Every part of the simulator that needs to know the time (time.time(),
+time.sleep(), time.ticks_ms(), the RTC, machine.Timer and
+machine.lightsleep()) takes it from the clock in this module.
+
+By default the clock follows the host's clock so the interactive simulator
+runs in real time. The test suite switches it to virtual time where the
+clock only moves when something sleeps or when a test moves it explicitly.
+This allows tests to jump hours ahead instantly:
+
+.. code-block:: python
+
+    import simclock
+    simclock.clock.advance(3 * 60 * 60 * 1000)
+"""
+
+import time
+
+_host_time = time.time
+_host_sleep = time.sleep
+_host_localtime = time.localtime
+
+class Clock(object):
+    # In virtual time a busy-wait on a machine.Timer would never finish
+    # so every read of a timer costs this many microseconds.
+    POLL_COST_US = 100
+
+    def __init__(self):
+        self.virtual = False
+        self._offset = 0
+        self._now = _host_time()
+
+    def use_virtual_time(self, virtual=True):
+        """Switch between virtual time and (offset) real time.
+
+        The clock carries on from the current time whichever way it is
+        switched.
+        """
+        now = self.time()
+        self.virtual = virtual
+        self._set(now)
+
+    def time(self):
+        """Get the current time, in seconds, in the same format as
+        time.time()."""
+        if self.virtual:
+            return self._now
+        return _host_time() + self._offset
+
+    def _set(self, t):
+        if self.virtual:
+            self._now = t
+        else:
+            self._offset = t - _host_time()
+
+    def sleep(self, secs):
+        """Sleep (or, in virtual time, simply move the clock forward)."""
+        if self.virtual:
+            self._now += secs
+        else:
+            _host_sleep(secs)
+
+    def poll(self):
+        """Account for the cost of polling a hardware timer."""
+        if self.virtual:
+            self._now += self.POLL_COST_US / 1000000
+
+    def advance(self, ms):
+        """Move the clock forward, running the system as we go.
+
+        See :py:meth:`.run_until`.
+
+        :param int ms: Number of milliseconds to advance by
+        """
+        self.run_until(self.time() + ms / 1000)
+
+    def run_until(self, t):
+        """Move the clock forward to time t, running the system as we go.
+
+        Rather than jumping straight to t the clock stops whenever an alarm,
+        a timer or an application tick falls due so that wasp.system._tick() can
+        handle them, in order, at the time they were expected.
+
+        :param float t: Time to stop at (in the same format as time.time())
+        """
+        import wasp
+        system = wasp.system
+
+        while True:
+            now = self.time()
+            deadline = system.next_alarm()
+            if deadline is None:
+                deadline = float('inf')
+            expiry = system.next_deadline()
+            if expiry is not None:
+                deadline = min(deadline, now + expiry / 1000)
+            if now >= t and deadline > now:
+                break
+
+            # Always move forward by at least 1ms otherwise the RTC will not
+            # report an update (and nothing will be handled)
+            self._set(max(min(deadline, t), now + 0.001))
+            system._tick()
+
+clock = Clock()
+
+def _sleep_ms(ms):
+    clock.sleep(ms / 1000)
+
+def _localtime(secs=None):
+    if secs is None:
+        secs = clock.time()
+    return _host_localtime(secs)
+
+time.time = clock.time
+time.sleep = clock.sleep
+time.sleep_ms = _sleep_ms
+time.ticks_ms = lambda : int(clock.time() * 1000)
+time.ticks_us = lambda : int(clock.time() * 1000 * 1000)
+time.ticks_diff = lambda x, y : x-y
+time.localtime = _localtime
@@ -1,17 +1,20 @@
 import pytest
-import time
+import simclock
 import wasp
 import apps.test
 import settings
+import steplogger
+import writeback
 
 def step():
     wasp.system._tick()
     wasp.machine.deepsleep()
-    time.sleep(0.1)
+    simclock.clock.sleep(0.1)
 wasp.system.step = step
 
 wasp.watch.touch.press = wasp.watch.touch.i2c.sim.press
 wasp.watch.touch.swipe = wasp.watch.touch.i2c.sim.swipe
+wasp.watch.touch.burst = wasp.watch.touch.i2c.sim.burst
 
 wasp.system.secondary_init()
 wasp.system.apps = {}
@@ -50,6 +53,147 @@ def test_app(system, name):
         system.step()
     system.switch(system.quick_ring[0])
 
+# Worst case bytes sent to the display in a single frame. These are set
+# about 15% above the measured cost so that a significant regression in
+# drawing efficiency will fail the tests.
+BUS_BUDGET = {
+    'WeekClk': 185000,
+    'Steps': 155000,
+    'Stopclock': 230000,
+    'Heart': 145000,
+    'Settings': 180000,
+}
+
+@pytest.mark.parametrize("name", BUS_BUDGET.keys())
+def test_bus_budget(system, bus_profile, name):
+    app = system.apps[name]
+    system.switch(system.apps['Software'])
+    bus_profile.reset()
+
+    system.switch(app)
+    for i in range(4):
+        system.step()
+
+    summary = bus_profile.summary()[name]
+    assert 0 < summary['max_spi_bytes'] <= BUS_BUDGET[name]
+    system.switch(system.quick_ring[0])
+
+def test_trace(system, capsys):
+    tracer = system.trace(4)
+    assert system.tracer is tracer
+    for i in range(6):
+        system.step()
+    assert system.trace(4) is tracer
+
+    entries = tracer.entries()
+    assert tracer.count >= 6
+    assert len(entries) == 4
+    for (ms, name, timings) in entries:
+        assert name == system.app.NAME
+        assert len(timings) == len(tracer.PHASES)
+    assert [e[0] for e in entries] == sorted(e[0] for e in entries)
+
+    tracer.dump()
+    out = capsys.readouterr().out.split('\n')
+    assert out[0] == 'uptime_ms,app,rtc,alarm,tick,button,touch,gc,total'
+    assert len(out) == 4 + 3
+
+    # Ticks that are faster than the threshold are not recorded
+    system.trace(4, threshold=1 << 30)
+    count = tracer.count
+    system.step()
+    assert tracer.count == count
+
+    assert system.trace(0) is None
+    system.step()
+
+def test_gc_policy(system, monkeypatch):
+    import gc
+    sleep = simclock.clock.sleep
+
+    policy = wasp.AdaptiveGcPolicy(idle_ms=500, max_ms=2000)
+    policy.poll(False)
+    assert policy.collections == 0
+
+    # Busy ticks must wait for max_ms, quiet ones only for idle_ms
+    sleep(0.6)
+    policy.poll(True)
+    assert policy.collections == 0
+    policy.poll(False)
+    assert policy.collections == 1
+    sleep(1.5)
+    policy.poll(True)
+    assert policy.collections == 1
+    sleep(0.6)
+    policy.poll(True)
+    assert policy.collections == 2
+
+    # Running low on memory always results in a collection
+    monkeypatch.setattr(gc, 'mem_free', lambda: 1024, raising=False)
+    policy.poll(True)
+    assert policy.collections == 3
+    assert policy.max_us <= policy.total_us
+
+    # The eager policy collects on every (awake) tick
+    monkeypatch.setattr(system, 'gc_policy', wasp.GcPolicy())
+    for i in range(3):
+        system.step()
+    assert system.gc_policy.collections == 3
+
+class InputApp():
+    NAME = 'Input'
+
+    def __init__(self):
+        self.events = []
+
+    def foreground(self):
+        wasp.system.request_event(wasp.EventMask.TOUCH |
+                                  wasp.EventMask.SWIPE_UPDOWN |
+                                  wasp.EventMask.SWIPE_LEFTRIGHT)
+
+    def touch(self, event):
+        self.events.append((event[1], event[2]))
+
+    def swipe(self, event):
+        self.events.append(event[0])
+        return False
+
+def test_touch_burst(system):
+    touch = wasp.watch.touch
+    app = InputApp()
+    system.switch(app)
+
+    # Touches that arrive faster than we handle them are queued
+    taps = [(10 * i, 20 * i) for i in range(1, 5)]
+    touch.burst(taps)
+    system.step()
+    assert app.events == taps
+    assert system.input_latency >= 0
+
+    # ... but the queue is finite
+    app.events.clear()
+    overruns = touch.overruns
+    touch.burst((i, i) for i in range(20))
+    system.step()
+    system.step()
+    assert app.events == [(i, i) for i in range(7)]
+    assert touch.overruns == overruns + 13
+
+    # Repeated swipes that arrive together are merged (but a new swipe
+    # must still be handled). Note that the simulator names swipes after
+    # the direction the content moves so 'left' is EventType.RIGHT.
+    app.events.clear()
+    touch.burst(('left', 'left', 'left', 'up'))
+    system.step()
+    assert app.events == [wasp.EventType.RIGHT, wasp.EventType.DOWN]
+    app.events.clear()
+    simclock.clock.sleep(0.2)
+    touch.burst(('up', ))
+    system.step()
+    assert app.events == [wasp.EventType.DOWN]
+
+    system.switch(system.quick_ring[0])
+
 def test_constructor(system, constructor):
     # Special case for the notification app
     if 'NotificationApp' in str(constructor):
@@ -160,3 +304,770 @@ def test_settings(system):
         system.step()
 
     assert(start_point == system.app._current_setting)
+
+def test_pager_scroll(system):
+    import display
+    from apps.system.pager import PagerApp
+
+    screen = display.spi_st7789_sim.screen
+
+    msg = ' '.join('Line {} of a long and very wordy message'.format(i)
+                   for i in range(40))
+    app = PagerApp(msg)
+    system.switch(app)
+
+    # Scrolled pages must look exactly like pages drawn from scratch
+    for direction in (wasp.EventType.UP, wasp.EventType.UP,
+                      wasp.EventType.DOWN, wasp.EventType.DOWN):
+        app.swipe((direction, 120, 120))
+        scrolled = screen()
+        assert wasp.watch.display.scroll_offset == (app._page * 216) % 240
+        app._draw()
+        assert (screen() == scrolled).all()
+
+    system.switch(system.quick_ring[0])
+    assert wasp.watch.display.scroll_offset == 0
+
+def test_gallery_raw(system, tmp_path, monkeypatch):
+    import display
+    import struct
+    from apps.gallery import GalleryApp
+
+    (w, h) = (100, 30)
+    pixels = [(x * 0x0841 + y * 0x20) & 0xffff
+                  for y in range(h) for x in range(w)]
+    (tmp_path / 'gallery').mkdir()
+    with open(tmp_path / 'gallery' / 'test', 'wb') as f:
+        f.write(b'W565' + struct.pack('<HH', w, h))
+        f.write(struct.pack(f'>{w*h}H', *pixels))
+    (tmp_path / 'logs').mkdir()
+    monkeypatch.chdir(tmp_path)
+
+    system.switch(GalleryApp())
+
+    p = display.spi_st7789_sim.screen()
+    x = (240 - w) // 2
+    assert list(p[0:h, x:x+w].flatten()) == pixels
+
+    system.switch(system.quick_ring[0])
+
+def test_timers(system):
+    clock = simclock.clock
+    uptime = wasp.watch.rtc.get_uptime_ms
+    fired = []
+
+    def log(name):
+        return lambda: fired.append((name, uptime()))
+
+    system.keep_awake()
+    start = uptime()
+    fast = system.set_timer(40, log('fast'), periodic=True)
+    system.set_timer(100, log('once'))
+    slow = system.set_timer(250, log('slow'), periodic=True, system=True)
+    assert 0 <= system.next_deadline() <= 40
+
+    # Virtual time stops at every deadline so the timers fire exactly on
+    # time
+    clock.advance(1000)
+    assert [t for (n, t) in fired if n == 'fast'] == \
+            [start + 40 * i for i in range(1, 26)]
+    assert [t for (n, t) in fired if n == 'once'] == [start + 100]
+    assert [t for (n, t) in fired if n == 'slow'] == \
+            [start + 250 * i for i in range(1, 5)]
+
+    assert system.cancel_timer(fast)
+    assert not system.cancel_timer(fast)
+    fired.clear()
+    clock.advance(500)
+    assert [n for (n, t) in fired] == ['slow', 'slow']
+
+    # Switching app cancels application timers but not system timers
+    system.set_timer(10, log('app'))
+    system.switch(system.apps['Steps'])
+    system.switch(system.quick_ring[0])
+    fired.clear()
+    clock.advance(300)
+    assert [n for (n, t) in fired] == ['slow']
+    assert system.cancel_timer(slow)
+
+    # A callback that switches app stops the outgoing app's timers, even
+    # those due in the same pass
+    def switch():
+        fired.append(('switch', uptime()))
+        system.switch(system.apps['Steps'])
+    system.set_timer(10, switch)
+    system.set_timer(10, log('app'))
+    fired.clear()
+    clock.advance(100)
+    assert [n for (n, t) in fired] == ['switch']
+    system.switch(system.quick_ring[0])
+
+    # A timer that restarts itself straight away fires once per pass
+    def again():
+        fired.append(('again', uptime()))
+        if len(fired) < 3:
+            system.set_timer(0, again)
+    fired.clear()
+    system.set_timer(0, again)
+    system._run_timers()
+    assert len(fired) == 1
+    system._run_timers()
+    system._run_timers()
+    assert len(fired) == 3
+
+def test_timer_sleep(system, monkeypatch):
+    slept = []
+    monkeypatch.setattr(wasp.machine, 'lightsleep', slept.append)
+    monkeypatch.setattr(wasp.machine, 'deepsleep', lambda: slept.append(None))
+    monkeypatch.setattr(wasp, '_timed_sleep', True)
+
+    # The main loop wakes up in time for a timer that is due soon...
+    timer = system.set_timer(40, lambda: None)
+    system._sleep()
+    assert slept[-1] is not None and 0 <= slept[-1] <= 40
+    system.cancel_timer(timer)
+
+    # ... but otherwise leaves it to the next interrupt
+    timer = system.set_timer(10000, lambda: None)
+    system._sleep()
+    assert slept[-1] is None
+    system.cancel_timer(timer)
+
+    # Ports that can't set a wake up time only check the timers when they
+    # wake up
+    def lightsleep():
+        slept.append('untimed')
+    monkeypatch.setattr(wasp.machine, 'lightsleep', lightsleep)
+    timer = system.set_timer(40, lambda: None)
+    system._sleep()
+    system._sleep()
+    assert slept[-2:] == [None, None]
+    assert not wasp._timed_sleep
+    system.cancel_timer(timer)
+
+@pytest.fixture
+def asleep(system, monkeypatch, tmp_path):
+    """Let the watch fall asleep (and stay asleep) when it is left alone.
+
+    Normally the simulated backlight presses the button as soon as the
+    watch goes to sleep. Disabling that, and holding the charge state
+    steady, means long stretches of virtual time are spent asleep and only
+    alarms need to be handled.
+
+    Hours can pass whilst the watch is asleep so anything written to the
+    filesystem (e.g. step logs) ends up in a temporary directory.
+    """
+    (tmp_path / 'logs').mkdir()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(wasp.watch.backlight, 'set', lambda level: None)
+    monkeypatch.setattr(wasp.watch.battery, 'charging', lambda: False)
+    monkeypatch.setattr(system.steps, '_log', None)
+    monkeypatch.setattr(system.steps, '_totals', None)
+    system.keep_awake()
+    yield system
+    writeback.sync()
+    system.wake()
+
+def test_virtual_clock(asleep):
+    system = asleep
+    clock = simclock.clock
+    now = wasp.watch.rtc.time()
+    fired = []
+
+    def alarm(n):
+        return lambda: fired.append((n, wasp.watch.rtc.time()))
+
+    offsets = (60, 60 * 60, 3 * 60 * 60)
+    system.set_alarm(now + offsets[2], alarm(2))
+    system.set_alarm(now + offsets[0], alarm(0))
+    system.set_alarm(now + offsets[1], alarm(1))
+
+    # Jumping four hours ahead must fire every alarm, in order, at the
+    # time it was due
+    clock.advance(4 * 60 * 60 * 1000)
+    assert [n for (n, t) in fired] == [0, 1, 2]
+    for ((n, t), offset) in zip(fired, offsets):
+        assert now + offset <= t < now + offset + 1
+    assert wasp.watch.rtc.time() >= now + 4 * 60 * 60
+
+def test_alarm_stress(asleep):
+    import random
+
+    system = asleep
+    rng = random.Random(19)
+    now = wasp.watch.rtc.time()
+    fired = []
+
+    def alarm(n):
+        return lambda: fired.append((n, wasp.watch.rtc.time()))
+
+    # Thousands of alarms, many of them due at the same time
+    expected = []
+    handles = []
+    for n in range(3000):
+        t = now + rng.randint(1, 2 * 60 * 60)
+        handles.append(system.set_alarm(t, alarm(n)))
+        expected.append((t, n))
+    crowd = now + 30
+    for n in range(3000, 3200):
+        system.set_alarm(crowd, alarm(n))
+        expected.append((crowd, n))
+
+    # Cancel a third of them (some by handle, some by time and action)
+    cancelled = set(rng.sample(range(3000), 1000))
+    for n in cancelled:
+        if n & 1:
+            assert system.cancel_alarm(handles[n])
+            assert not system.cancel_alarm(handles[n])
+        else:
+            assert system.cancel_alarm(handles[n][0], handles[n][2])
+    expected = [(t, n) for (t, n) in sorted(expected) if n not in cancelled]
+
+    simclock.clock.advance((2 * 60 * 60 + 10) * 1000)
+    assert [n for (n, t) in fired] == [n for (t, n) in expected]
+    for ((n, t), (due, m)) in zip(fired, expected):
+        assert due <= t < due + 1
+
+    # Everything due at the same time must fire in a single pass
+    assert len(set(t for (n, t) in fired if n >= 3000)) == 1
+    seqs = set(h[1] for h in handles)
+    assert not [a for a in system._alarms if a[1] in seqs]
+
+def test_alarm_rearm(asleep):
+    system = asleep
+    now = wasp.watch.rtc.time()
+    fired = []
+
+    # An action that raises must not lose alarms re-armed (already due)
+    # earlier in the same pass
+    def rearm():
+        fired.append('rearm')
+        system.set_alarm(now, rearm)
+
+    def crash():
+        raise RuntimeError('crash')
+
+    system.set_alarm(now + 10, rearm)
+    system.set_alarm(now + 10, crash)
+    with pytest.raises(RuntimeError):
+        system._run_alarms(now + 10)
+    assert fired == ['rearm']
+    assert system.next_alarm() == now
+    assert system.cancel_alarm(None, rearm)
+
+    # An alarm set and cancelled within the same pass never fires
+    def late():
+        fired.append('late')
+
+    def cancel():
+        handle = system.set_alarm(now, late)
+        assert system.cancel_alarm(now, late)
+        assert not system.cancel_alarm(handle)
+
+    fired.clear()
+    system.set_alarm(now + 20, cancel)
+    system._run_alarms(now + 20)
+    system._run_alarms(now + 20)
+    assert fired == []
+
+def test_alarm_cancel(asleep):
+    system = asleep
+    now = wasp.watch.rtc.time()
+    fired = []
+
+    def action():
+        fired.append('action')
+
+    # Anything that isn't a handle is ignored
+    assert not system.cancel_alarm(None)
+    assert not system.cancel_alarm(now)
+    assert not system.cancel_alarm((now, 1, action))
+
+    # The time and the action cancel one alarm, just the action all of
+    # them
+    for i in range(3):
+        system.set_alarm(now + 10, action)
+    assert system.cancel_alarm(now + 10, action)
+    system._run_alarms(now + 10)
+    assert fired == ['action', 'action']
+    for i in range(3):
+        system.set_alarm(now + 20, action)
+    assert system.cancel_alarm(None, action)
+    assert not system.cancel_alarm(None, action)
+    system._run_alarms(now + 20)
+    assert fired == ['action', 'action']
+
+def test_step_log(asleep):
+    import array
+    import os
+    import time
+    from tools import steplog
+
+    system = asleep
+    logger = system.steps
+    simclock.clock.advance(7 * 60 * 60 * 1000)
+
+    # Whatever the watch wrote the host tools must be able to read
+    writeback.sync()
+    t = int(wasp.watch.rtc.time())
+    now = time.localtime(t)
+    days = steplog.read('logs/{}.steps'.format(now[0]))
+    assert days
+    for (doy, host) in days.items():
+        day = time.localtime(time.mktime((now[0], 1, doy, 0, 0, 0, 0, 0, 0)))
+        samples = list(logger.data(day))
+        assert len(samples) == steplogger.DAY_LENGTH
+        if doy == now[7]:
+            # Today includes samples that have not been written yet
+            n = (now[3] * 60 + now[4]) * 60 // steplogger.DUMP_PERIOD
+            n *= steplogger.DUMP_LENGTH
+            assert samples[:n] == host[:n]
+        else:
+            assert samples == host
+        assert sum(host)
+
+    # Old style logs are still readable... and can be migrated
+    doy = [d for d in (1, 2, 3) if d not in days][0]
+    day = time.localtime(time.mktime((now[0], 1, doy, 0, 0, 0, 0, 0, 0)))
+    legacy = [i * 3 for i in range(100)]
+    os.mkdir('logs/{}'.format(now[0]))
+    fname = 'logs/{}/01-{:02d}.steps'.format(now[0], doy)
+    with open(fname, 'wb') as f:
+        f.write(array.array('H', legacy))
+    expected = legacy + [0] * (steplogger.DAY_LENGTH - len(legacy))
+    assert list(logger.data(day)) == expected
+
+    # The migration changes the log behind the logger's back so it must
+    # reopen it afterwards
+    steplog.migrate('logs', delete=True)
+    logger._log = None
+    logger._totals = None
+    assert not os.path.exists(fname)
+    assert isinstance(logger.data(day), array.array)
+    assert list(logger.data(day)) == expected
+
+def test_step_log_reset(asleep):
+    system = asleep
+    logger = system.steps
+    simclock.clock.advance(4 * 60 * 60 * 1000)
+
+    # The step counter is reset at midnight (which may happen before the
+    # logger takes its next sample)
+    wasp.watch.accel.steps = 0
+    samples = logger.data(wasp.watch.rtc.time())
+    assert min(samples) >= 0
+    assert max(samples) < 10000
+
+def test_step_log_readers(asleep):
+    import time
+
+    system = asleep
+    logger = system.steps
+    simclock.clock.advance(2 * 24 * 60 * 60 * 1000)
+    writeback.sync()
+    assert not writeback._journals
+
+    # Reading the logs must not leave journals behind
+    now = wasp.watch.rtc.time()
+    yyyy = time.localtime(now)[0]
+    for i in range(50):
+        logger.data(now - 24 * 60 * 60)
+        logger.totals(yyyy - 1, steplogger.DAILY, 366)
+    assert not writeback._journals
+
+def test_step_log_repair(asleep, monkeypatch):
+    import array
+    import os
+    import time
+    from tools import steplog
+
+    system = asleep
+    logger = system.steps
+    yyyy = time.localtime(wasp.watch.rtc.time())[0]
+    fname = 'logs/{}.steps'.format(yyyy)
+    total = 'logs/{}.total'.format(yyyy)
+
+    # Stop the simulated step counter from moving whilst we look at it
+    accel = wasp.watch.accel
+    monkeypatch.setattr(type(accel), 'steps',
+            property(lambda a: a._steps, lambda a, v: setattr(a, '_steps', v)))
+
+    def check(hours):
+        accel._steps += 1000
+        simclock.clock.advance(hours * 60 * 60 * 1000)
+        writeback.sync()
+
+        # Look at the day of the last dump that was recorded
+        now = wasp.watch.rtc.time()
+        day = time.localtime(now // steplogger.DUMP_PERIOD *
+                             steplogger.DUMP_PERIOD - 1)
+        assert day[7] in steplog.read(fname)
+        daily = logger.totals(yyyy, steplogger.DAILY + day[7] - 1)[0]
+        assert daily == sum(logger.data(day)) > 0
+
+    # An interrupted first flush leaves an empty file behind...
+    open(fname, 'wb').close()
+    # ... and a damaged totals file is set aside
+    with open(total, 'wb') as f:
+        f.write(b'not a totals file')
+    check(4)
+    assert os.path.exists(total + '.bad')
+
+    # Tear the header updates of the last flush
+    def tear(fname, offset):
+        with open(fname, 'r+b') as f:
+            f.seek(7)
+            b = f.read(1)[0]
+            f.seek(7)
+            f.write(bytes((b | 0x80,)))
+            f.seek(offset)
+            f.write(array.array('I', (12345678,)))
+
+    doy = time.localtime(wasp.watch.rtc.time())[7]
+    tear(fname, steplogger._INDEX + 4 * (doy - 1))
+    tear(total, 8 + 4 * (doy - 1))
+    logger._log = None
+    logger._totals = None
+
+    # The host tools can still add to a torn log (and leave the repair to
+    # the watch)
+    assert steplog.append(fname, 1, [1] * steplogger.DAY_LENGTH)
+    assert steplog.read(fname)[1] == [1] * steplogger.DAY_LENGTH
+    with open(fname, 'rb') as f:
+        assert f.read(8)[7] & 0x80
+    check(3)
+    assert steplog.read(fname)[1] == [1] * steplogger.DAY_LENGTH
+    assert sum(logger.data(time.localtime(time.mktime(
+            (yyyy, 1, 1, 0, 0, 0, 0, 0, 0))))) == steplogger.DAY_LENGTH
+
+def test_step_log_changed(asleep):
+    import os
+    import time
+    from tools import steplog
+
+    system = asleep
+    logger = system.steps
+    simclock.clock.advance(2 * 24 * 60 * 60 * 1000)
+    yyyy = time.localtime(wasp.watch.rtc.time())[0]
+    fname = 'logs/{}.steps'.format(yyyy)
+    total = 'logs/{}.total'.format(yyyy)
+
+    # Change both files behind the logger's back whilst it is holding
+    # data for them
+    simclock.clock.advance(3 * 60 * 60 * 1000)
+    assert writeback._journals
+    legacy = [i * 3 for i in range(100)]
+    expected = legacy + [0] * (steplogger.DAY_LENGTH - len(legacy))
+    steplog.append(fname, 1, legacy)
+    os.remove(total)
+
+    simclock.clock.advance(24 * 60 * 60 * 1000)
+    writeback.sync()
+    days = steplog.read(fname)
+    assert days[1] == expected
+    assert len(days) >= 4
+    jan1 = time.localtime(time.mktime((yyyy, 1, 1, 0, 0, 0, 0, 0, 0)))
+    assert list(logger.data(jan1)) == expected
+
+    # The totals were rebuilt
+    daily = logger.totals(yyyy, steplogger.DAILY, 366)
+    assert daily[0] == sum(legacy)
+    for (doy, samples) in days.items():
+        if doy != time.localtime(wasp.watch.rtc.time())[7]:
+            assert daily[doy - 1] == sum(samples)
+
+def test_step_log_writeback(asleep):
+    import time
+    from tools import steplog
+
+    system = asleep
+    logger = system.steps
+    yyyy = time.localtime(wasp.watch.rtc.time())[0]
+    fname = 'logs/{}.steps'.format(yyyy)
+
+    def run(days, max_bytes=writeback.PAGE):
+        logger._log = None
+        logger._log = logger._journal(yyyy)
+        logger._log.max_bytes = max_bytes
+        writes = logger._log.writes
+        commits = logger._log.commits
+        simclock.clock.advance(days * 24 * 60 * 60 * 1000)
+        writeback.sync()
+        return (logger._log.writes - writes, logger._log.commits - commits)
+
+    # Writing every record as soon as it is ready...
+    (unbatched, unbatched_commits) = run(4, max_bytes=0)
+    assert unbatched_commits >= 4 * 8
+
+    # ... costs far more flash writes than batching them up
+    (batched, batched_commits) = run(4)
+    assert batched_commits * 4 <= unbatched_commits
+    assert batched * 2 <= unbatched
+
+    # Nothing has been lost along the way
+    days = steplog.read(fname)
+    assert len(days) >= 8
+    today = time.localtime(wasp.watch.rtc.time())[7]
+    for (doy, host) in days.items():
+        if doy != today:
+            day = time.localtime(time.mktime((yyyy, 1, doy, 0, 0, 0, 0, 0, 0)))
+            assert list(logger.data(day)) == host
+
+def test_step_log_sleep(asleep):
+    system = asleep
+    simclock.clock.advance(7 * 60 * 60 * 1000)
+    assert writeback._journals
+
+    # Going to sleep writes out everything the logs are holding in RAM
+    system.wake()
+    system.sleep()
+    assert not writeback._journals
+
+def test_journal_flush_error(asleep, monkeypatch):
+    import builtins
+
+    journal = writeback.Journal('logs/test.dat', b'TST1', 8)
+    journal.append(b'x' * 32)
+
+    files = []
+    def fake_open(*args):
+        files.append(builtins.open(*args))
+        return files[-1]
+    def fail(*args):
+        raise OSError(28)
+    monkeypatch.setattr(writeback, 'open', fake_open, raising=False)
+    monkeypatch.setattr(journal, '_write', fail)
+
+    # The file is closed even if the flush fails part way through
+    with pytest.raises(OSError):
+        journal.flush()
+    assert files and files[-1].closed
+    journal._clean()
+
+def test_step_totals(asleep, monkeypatch):
+    import os
+    import time
+
+    system = asleep
+    logger = system.steps
+    simclock.clock.advance(10 * 24 * 60 * 60 * 1000)
+
+    # Stop the simulated step counter from moving whilst we look at it
+    accel = wasp.watch.accel
+    monkeypatch.setattr(type(accel), 'steps', property(lambda a: a._steps))
+    now = time.localtime(wasp.watch.rtc.time())
+    yyyy = now[0]
+
+    daily = logger.totals(yyyy, steplogger.DAILY, 366)
+    weekly = logger.totals(yyyy, steplogger.WEEKLY, 54)
+    monthly = logger.totals(yyyy, steplogger.MONTHLY, 12)
+    assert sum(daily) == sum(weekly) == sum(monthly) > 0
+    assert daily[now[7] - 1]
+
+    # The totals match the samples (including the latest samples)
+    months = [0] * 12
+    for doy in range(1, 367):
+        t = time.mktime((yyyy, 1, doy, 0, 0, 0, 0, 0, 0))
+        day = time.localtime(t)
+        if day[0] != yyyy:
+            break
+        data = logger.data(day)
+        steps = sum(data) if data else 0
+        assert daily[doy - 1] == steps
+        assert logger.totals(yyyy, steplogger.DAILY + doy - 1)[0] == steps
+        months[day[1] - 1] += steps
+    assert list(monthly) == months
+
+    # Weeks start on Monday
+    monday = time.localtime(time.mktime(now[:2] + (now[2] - now[6],
+                                                   0, 0, 0, 0, 0, 0)))
+    if monday[0] == yyyy:
+        week = logger.totals(yyyy, steplogger.DAILY + monday[7] - 1,
+                             now[6] + 1)
+        assert weekly[steplogger._week(now)] == sum(week)
+
+    # A missing totals file is rebuilt from the step log
+    writeback.sync()
+    os.remove('logs/{}.total'.format(yyyy))
+    logger._totals = None
+    assert logger.totals(yyyy, steplogger.DAILY, 366) == daily
+    assert logger.totals(yyyy, steplogger.MONTHLY, 12) == monthly
+
+def test_step_totals_legacy(asleep):
+    import array
+    import os
+    import time
+    from tools import steplog
+
+    system = asleep
+    logger = system.steps
+    simclock.clock.advance(2 * 24 * 60 * 60 * 1000)
+    writeback.sync()
+    yyyy = time.localtime(wasp.watch.rtc.time())[0]
+
+    # Days that are still in the old style logs are included when the
+    # totals are rebuilt (even for a year with no new style log at all)
+    legacy = array.array('H', [i * 3 for i in range(100)])
+    days = steplog.read('logs/{}.steps'.format(yyyy))
+    doy = [d for d in (1, 2, 3) if d not in days][0]
+    for y in (yyyy, yyyy - 1):
+        os.mkdir('logs/{}'.format(y))
+        with open('logs/{}/01-{:02d}.steps'.format(y, doy), 'wb') as f:
+            f.write(legacy)
+    os.remove('logs/{}.total'.format(yyyy))
+    logger._totals = None
+
+    for y in (yyyy, yyyy - 1):
+        assert logger.totals(y, steplogger.DAILY + doy - 1)[0] == sum(legacy)
+    assert logger.totals(yyyy - 1, steplogger.MONTHLY)[0] == sum(legacy)
+
+def test_step_counter_views(asleep, monkeypatch):
+    system = asleep
+    logger = system.steps
+    simclock.clock.advance(3 * 24 * 60 * 60 * 1000)
+
+    # The graphs are labelled with the totals rather than by summing the
+    # samples each time they are drawn
+    calls = []
+    totals = logger.totals
+    def spy(yyyy, first=steplogger.DAILY, count=1):
+        calls.append((first, count))
+        return totals(yyyy, first, count)
+    monkeypatch.setattr(logger, 'totals', spy)
+
+    app = system.apps['Steps']
+    system.switch(app)
+    app.touch((wasp.EventType.TOUCH, 120, 120))
+    assert app._view == 0 and not calls
+
+    app.swipe((wasp.EventType.UP, 120, 120))
+    assert calls[-1][1] == 1
+    app.touch((wasp.EventType.TOUCH, 120, 120))
+    assert calls[-1] == (steplogger.WEEKLY, 54)
+    app.touch((wasp.EventType.TOUCH, 120, 120))
+    assert calls[-1] == (steplogger.MONTHLY, 12)
+
+    # Look back a year (there is no data) and then return to the days
+    app.swipe((wasp.EventType.UP, 120, 120))
+    app.touch((wasp.EventType.TOUCH, 120, 120))
+    assert app._view == 0 and app._page == 0
+    app.swipe((wasp.EventType.DOWN, 120, 120))
+    assert app._page == -1
+    system.switch(system.quick_ring[0])
+
+def test_log_sync(asleep, tmp_path):
+    import array
+    import binascii
+    import logsync
+    import os
+    from tools import logsync as host
+
+    system = asleep
+    simclock.clock.advance(2 * 24 * 60 * 60 * 1000)
+    hrs = b'\xff\xff' + bytes(array.array('H', (2021, 1, 2, 3, 4, 5)))
+    with open('hrs.data', 'wb') as f:
+        f.write(hrs + bytes(array.array('H', range(100))))
+    dest = str(tmp_path / 'sync')
+
+    # Loop the frames straight back to the host side (optionally damaging
+    # one of them on the way)
+    def sync(since=None, damage=None):
+        rx = host.Receiver(dest)
+        frames = []
+        logsync.send(rx.since if since is None else since, rx.resume(),
+                     frames.append)
+        if damage is not None:
+            f = frames[damage]
+            frames[damage] = f[:12] + ('A' if f[12] != 'A' else 'B') + f[13:]
+        try:
+            rx = host.receive(frames, dest)
+        except host.FrameError:
+            rx = None
+        return rx, frames
+
+    def synced(fname):
+        with open(fname, 'rb') as f, \
+             open(os.path.join(dest, fname), 'rb') as g:
+            return f.read() == g.read()
+
+    names = logsync.files()
+    assert 'hrs.data' in names
+    assert [n for n in names if n.endswith('.steps')]
+    assert [n for n in names if n.endswith('.total')]
+
+    (rx, frames) = sync()
+    assert all(synced(n) for n in names)
+    assert rx.since
+
+    # Nothing has changed since the last sync
+    (rx, frames) = sync()
+    assert len(frames) == 1
+
+    # Only new data (and the headers that change in place) are resent
+    more = bytes(array.array('H', range(1000)))
+    with open('hrs.data', 'ab') as f:
+        f.write(hrs + more)
+    total = sum(os.stat(n)[6] for n in names if n.endswith('.total'))
+    headers = steplogger._HEADER * len([n for n in names
+                                        if n.endswith('.steps')])
+    (rx, frames) = sync(since=0)
+    received = sum(len(host.decode(f)[2]) for f in frames
+                   if host.decode(f)[0] == 'D')
+    assert received == len(hrs + more) + headers + total
+    assert all(synced(n) for n in names)
+
+    # An interrupted sync carries on where it left off
+    with open('hrs.data', 'ab') as f:
+        f.write(hrs + more)
+    (rx, frames) = sync(since=0, damage=-12)
+    assert rx is None
+    assert not synced('hrs.data')
+    (rx, frames) = sync(since=0)
+    hrs_frames = [f for f in frames if host.decode(f)[0] == 'D' and
+                  host.decode(f)[1] >= os.stat('hrs.data')[6] - len(more)]
+    assert len(hrs_frames) < 12
+    assert all(synced(n) for n in names)
+    assert not rx.failed
+
+    # The logs can be exported as CSV
+    csv = host.export(dest, names)
+    assert os.path.join(dest, 'hrs.csv') in csv
+    with open(os.path.join(dest, 'hrs.csv')) as f:
+        rows = f.read().split('\n')
+    assert rows[0].startswith('20210102T030405,0,1,2,')
+    assert len(rows[2].split(',')) == 1 + 1000
+
+    # ... including the totals and any old style step logs
+    legacy = 'logs/2021/01-02.steps'
+    os.mkdir(os.path.join(dest, 'logs/2021'))
+    with open(os.path.join(dest, legacy), 'wb') as f:
+        f.write(array.array('H', range(10)))
+    csv = host.export(dest, names + [legacy])
+    with open(os.path.join(dest, 'logs/2021/01-02.csv')) as f:
+        assert f.read().startswith('2021-01-02,45,0,1,2,')
+    yyyy = [n for n in names if n.endswith('.total')][0][5:9]
+    out = os.path.join(dest, 'logs/{}-total.csv'.format(yyyy))
+    assert out in csv
+    with open(out) as f:
+        rows = [r.split(',') for r in f.read().split()]
+    assert {r[0] for r in rows} == {'day', 'week', 'month'}
+    assert sum(int(r[2]) for r in rows if r[0] == 'day') == \
+           sum(int(r[2]) for r in rows if r[0] == 'month') > 0
+
+    # The fallback CRC matches binascii
+    assert logsync._crc32(b'123456789') == 0xcbf43926
+    assert logsync._crc32(more, logsync._crc32(hrs)) == \
+           binascii.crc32(hrs + more)
+
+def test_midnight_reset(asleep):
+    system = asleep
+    steps = system.apps['Steps']
+    system.switch(steps)
+    system.switch(system.quick_ring[0])
+
+    wake = steps._wake
+    simclock.clock.run_until(wake - 1)
+    before = wasp.watch.accel.steps
+    simclock.clock.run_until(wake + 1)
+    assert wasp.watch.accel.steps < before
+    assert steps._wake == wake + 24 * 60 * 60
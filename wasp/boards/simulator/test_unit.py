@@ -70,3 +70,459 @@ def test_font_width(draw):
 ))
 def test_wrap(draw, input, expected):
     assert draw.wrap(input, 240) == expected
+
+def test_compositor():
+    import watch
+    comp = draw565.Compositor(watch.drawable)
+
+    def frame(t):
+        comp.fill()
+        comp.string(t, 0, 108, width=240)
+        comp.fill(0xf800, 10, 10, 20, 20)
+        comp.flush()
+
+    frame('12:34')
+    (submitted, flushed, full) = comp.counters()
+    assert submitted == 3
+    assert flushed == 1
+    assert full >= 2 * 240 * 240
+
+    comp.reset_counters()
+    frame('12:34')
+    assert comp.counters() == (3, 0, 0)
+
+    comp.reset_counters()
+    frame('12:35')
+    (submitted, flushed, sent) = comp.counters()
+    assert flushed == 1
+    assert 0 < sent < full
+
+    comp.invalidate()
+    comp.reset_counters()
+    frame('12:35')
+    assert comp.counters()[2] == full
+
+def _screen():
+    """Capture the display contents (RGB565), indexed as [y][x]."""
+    import display
+    return display.spi_st7789_sim.screen()
+
+def test_glyph_cache():
+    import watch
+    draw = watch.drawable
+    draw.reset()
+
+    draw.fill()
+    draw.string('12:34', 0, 108, width=240)
+    expected = _screen()
+
+    cache = draw565.RasterCache(8192)
+    draw.glyph_cache = cache
+    try:
+        for i in range(2):
+            draw.fill()
+            draw.string('12:34', 0, 108, width=240)
+            assert (_screen() == expected).all()
+    finally:
+        draw.glyph_cache = None
+
+    # Five distinct glyphs, all of which are hits on the second draw
+    assert cache.misses == 5
+    assert cache.hits == 5
+    assert cache.used <= cache.budget
+
+    # Evict when over budget
+    small = draw565.RasterCache(cache.used // 2)
+    for (k, v) in cache._data.items():
+        small.put(k, v)
+    assert small.used <= small.budget
+    assert len(small._lru) < len(cache._lru)
+
+    # Replacing an entry does not count it twice
+    (k, v) = next(iter(small._data.items()))
+    used = small.used
+    for i in range(4):
+        assert small.put(k, v)
+    assert small.used == used
+    assert small._lru.count(k) == 1
+    assert small._lru[-1] == k
+
+@pytest.mark.parametrize("x,width,right",
+        ((4, None, False), (0, 240, False), (20, 200, True)))
+def test_string_batched(x, width, right):
+    import watch
+    draw = watch.drawable
+    display = watch.display
+    draw.reset()
+    draw.set_color(0xffff, 0x4208)
+
+    draw.fill()
+    draw.string('Batched 12:34', x, 108, width=width, right=right)
+    batched = _screen()
+
+    # Shrink the line buffer to force the glyph-by-glyph path
+    linebuffer = display.linebuffer
+    display.linebuffer = linebuffer[:80]
+    try:
+        draw.fill()
+        draw.string('Batched 12:34', x, 108, width=width, right=right)
+        assert (_screen() == batched).all()
+    finally:
+        display.linebuffer = linebuffer
+        draw.reset()
+
+def _reference_line(draw, x0, y0, x1, y1, width, color):
+    """Draw a line one width x width square at a time."""
+    dw = (width - 1) // 2
+    x0 -= dw
+    y0 -= dw
+    x1 -= dw
+    y1 -= dw
+    dx = abs(x1 - x0)
+    sx = 1 if x0 < x1 else -1
+    dy = -abs(y1 - y0)
+    sy = 1 if y0 < y1 else -1
+    err = dx + dy
+    while True:
+        draw.fill(color, x0, y0, width, width)
+        if x0 == x1 and y0 == y1:
+            break
+        e2 = 2 * err
+        if e2 >= dy:
+            err += dy
+            x0 += sx
+        if e2 <= dx:
+            err += dx
+            y0 += sy
+
+@pytest.mark.parametrize("width", (1, 2, 5))
+def test_line_spans(width):
+    import watch
+    draw = watch.drawable
+    lines = ((120, 120, 170, 139), (120, 120, 139, 170), (120, 120, 70, 101),
+             (120, 120, 101, 70), (120, 120, 200, 40), (120, 120, 121, 200))
+
+    draw.fill()
+    for ln in lines:
+        _reference_line(draw, *ln, width, 0xf800)
+    expected = _screen()
+
+    draw.fill()
+    for ln in lines:
+        draw.line(*ln, width, 0xf800)
+    assert (_screen() == expected).all()
+
+    draw.fill()
+    draw.polyline(((120, 120), (170, 139), (139, 170), (70, 101)), width, 0xf800)
+    polyline = _screen()
+    draw.fill()
+    draw.line(120, 120, 170, 139, width, 0xf800)
+    draw.line(170, 139, 139, 170, width, 0xf800)
+    draw.line(139, 170, 70, 101, width, 0xf800)
+    assert (_screen() == polyline).all()
+
+def test_circles():
+    import math
+    import watch
+    draw = watch.drawable
+
+    draw.fill()
+    draw.fill_circle(120, 120, 50, 0xffff)
+    lit = _screen() != 0
+    assert lit.sum() == pytest.approx(math.pi * 50 * 50, rel=0.02)
+    assert lit[120, 70] and lit[120, 170] and lit[70, 120] and lit[170, 120]
+    assert not lit[69, 120] and not lit[171, 120]
+
+    draw.fill()
+    draw.circle(120, 120, 50, 6, 0xffff)
+    ring = _screen() != 0
+    assert ring.sum() == pytest.approx(math.pi * (50*50 - 44*44), rel=0.05)
+    assert not ring[120, 120] and ring[120, 70] and ring[120, 168]
+
+    # A full arc is the same as a circle
+    draw.fill()
+    draw.arc(120, 120, 50, 0, 360, 6, 0xffff)
+    assert (ring == (_screen() != 0)).all()
+
+    # A quarter arc is the top-right quarter of the ring
+    draw.fill()
+    draw.arc(120, 120, 50, 0, 90, 6, 0xffff)
+    quarter = _screen() != 0
+    assert not quarter[:, :120].any()
+    assert not quarter[121:, :].any()
+    assert (quarter[:121, 120:] == ring[:121, 120:]).all()
+
+    # ... and an arc that wraps through zero
+    draw.fill()
+    draw.arc(120, 120, 50, 270, 450, 6, 0xffff)
+    half = _screen() != 0
+    assert not half[121:, :].any()
+    assert (half[:120, :] == ring[:120, :]).all()
+
+def test_round_rect():
+    import watch
+    draw = watch.drawable
+
+    draw.fill()
+    draw.round_rect(40, 60, 160, 100, 12, 0xffff)
+    lit = _screen() != 0
+    assert lit[60:160, 40:200].sum() == lit.sum()
+    assert lit[110, 40] and lit[60, 120] and lit[159, 120] and lit[110, 199]
+    assert not lit[60, 40] and not lit[159, 199]
+    assert lit[60+12, 40+12]
+
+    # Empty rectangles draw nothing
+    draw.fill()
+    for (w, h) in ((0, 100), (160, 0), (-4, 100), (160, -4)):
+        draw.round_rect(40, 60, w, h, 12, 0xffff)
+    assert not (_screen() != 0).any()
+
+def _reference_rle2bit(image, fg, c1, c2):
+    """Decode a 2-bit RLE image into a list of RGB565 pixels."""
+    palette = [0, c1, c2, fg]
+    next_color = 1
+    pixels = []
+    rl = 0
+    for op in image[3:]:
+        if rl == 0:
+            px = op >> 6
+            rl = op & 0x3f
+            if 0 == rl:
+                rl = -1
+                continue
+            if rl >= 63:
+                continue
+        elif rl > 0:
+            rl += op
+            if op >= 255:
+                continue
+        else:
+            palette[next_color] = draw565._clut8_rgb565(op)
+            next_color = next_color + 1 if next_color < 3 else 1
+            rl = 0
+            continue
+        pixels += [palette[px]] * rl
+        rl = 0
+    return pixels
+
+def test_rle2bit():
+    import icons
+    import numpy as np
+    import watch
+    from apps.gallery import GalleryApp
+    draw = watch.drawable
+
+    images = [getattr(icons, n) for n in dir(icons) if not n.startswith('_')]
+    images = [i for i in images if isinstance(i, bytes) and i[0] == 2]
+    images.append(GalleryApp.ICON)
+    assert len(images) > 10
+
+    for image in images:
+        (sx, sy) = (image[1], image[2])
+        draw.fill()
+        draw.blit(image, 0, 0, 0xffe0, 0x4a69, 0xf800)
+        expected = _reference_rle2bit(image, 0xffe0, 0x4a69, 0xf800)
+        expected = np.array(expected[:sx*sy]).reshape((sy, sx))
+        assert (_screen()[:sy, :sx] == expected).all()
+
+def test_image_cache():
+    import draw565
+    import icons
+    import numpy as np
+    import watch
+    draw = watch.drawable
+
+    images = [getattr(icons, n) for n in dir(icons) if not n.startswith('_')]
+    images = [i for i in images if isinstance(i, bytes) and i[0] == 2]
+    images = [i for i in images if i[1] * i[2] <= 2048][:4]
+    assert len(images) == 4
+
+    draw.image_cache = draw565.RasterCache(4096 * 4)
+    try:
+        for i in range(2):
+            for image in images:
+                (sx, sy) = (image[1], image[2])
+                draw.fill()
+                draw.blit(image, 8, 8, 0xffe0, 0x4a69, 0xf800)
+                expected = _reference_rle2bit(image, 0xffe0, 0x4a69, 0xf800)
+                expected = np.array(expected[:sx*sy]).reshape((sy, sx))
+                assert (_screen()[8:8+sy, 8:8+sx] == expected).all()
+        cache = draw.image_cache
+        assert cache.misses == 4
+        assert cache.hits == 4
+
+        # Changing the colours must not re-use the cached pixels
+        draw.blit(images[0], 0, 0, 0x001f)
+        assert cache.misses == 5
+
+        # A tiny budget means images are streamed instead
+        draw.image_cache = draw565.RasterCache(64)
+        draw.blit(images[0], 0, 0)
+        assert draw.image_cache.used == 0
+    finally:
+        draw.image_cache = None
+
+def test_scroll():
+    import numpy as np
+    import watch
+    display = watch.display
+    draw = watch.drawable
+    draw.reset()
+
+    try:
+        draw.fill()
+        for i in range(10):
+            draw.string('Line {}'.format(i), 0, 24*i)
+        before = _screen()
+
+        draw.scroll(48)
+        assert display.scroll_offset == 48
+        after = _screen()
+        assert (after[0:192] == before[48:240]).all()
+        assert (after[192:240] == 0).all()
+
+        # A fill that straddles the wrap must land where it was asked to
+        draw.fill(0xf800, 10, 180, 20, 30)
+        assert (_screen()[180:210, 10:30] == 0xf800).all()
+
+        draw.scroll(-48)
+        assert display.scroll_offset == 0
+        after = _screen()
+        assert (after[48:192] == before[48:192]).all()
+        assert (after[0:48] == 0).all()
+
+        # Scrolling by more than the display height clears everything
+        for dy in (240, 300, -500):
+            draw.string('Line', 0, 100)
+            draw.scroll(dy)
+            assert 0 <= display.scroll_offset < 240
+            assert (_screen() == 0).all()
+    finally:
+        display.scroll(0)
+
+def test_deep_linebuffer():
+    import draw565
+    import icons
+    import watch
+    from machine import Pin
+    from drivers.st7789 import ST7789_SPI
+
+    def render(display):
+        spi = watch.spi
+        draw = draw565.Draw565(display)
+        draw.fill()
+        spi.reset_counters()
+        draw.fill(0x001f, 10, 10, 200, 100)
+        draw.blit(icons.app, 20, 120)
+        draw.string('Deep', 100, 120)
+        return (spi.transactions, spi.bytes, _screen())
+
+    deep = ST7789_SPI(240, 240, watch.spi,
+            cs=Pin("DISP_CS", Pin.OUT, quiet=True),
+            dc=Pin("DISP_DC", Pin.OUT, quiet=True),
+            res=Pin("DISP_RST", Pin.OUT, quiet=True),
+            rows=8)
+    assert len(deep.linebuffers) == 2
+    assert len(deep.linebuffers[1]) == 8 * 2 * 240
+
+    (shallow_xfers, shallow_bytes, expected) = render(watch.display)
+    (deep_xfers, deep_bytes, actual) = render(deep)
+    assert (actual == expected).all()
+    assert deep_bytes == shallow_bytes
+    assert deep_xfers * 2 < shallow_xfers
+
+def test_narrow_linebuffer():
+    import draw565
+    import fonts
+    import watch
+    display = watch.display
+    draw = watch.drawable
+    draw.reset()
+    glyph = fonts.sans24.get_ch('W')
+
+    draw.fill()
+    draw565._draw_glyph(display, glyph, 10, 10, draw._bgfg)
+    expected = _screen()
+
+    # A line buffer narrower than the glyph must not stop it being drawn
+    saved = (display.linebuffer, display.linebuffers)
+    draw.fill()
+    try:
+        display.linebuffers = (memoryview(bytearray(8)),
+                               memoryview(bytearray(8)))
+        display.linebuffer = display.linebuffers[0]
+        draw565._draw_glyph(display, glyph, 10, 10, draw._bgfg)
+    finally:
+        (display.linebuffer, display.linebuffers) = saved
+    assert (_screen() == expected).all()
+
+def test_save_image(tmp_path):
+    import display
+    import numpy as np
+    import watch
+    from PIL import Image
+    draw = watch.drawable
+
+    draw.fill(0)
+    draw.fill(0xf800, 0, 0, 120, 120)
+    fname = tmp_path / 'screenshot.png'
+    display.save_image(display.windowsurface, fname)
+
+    image = np.asarray(Image.open(fname))
+    assert image.shape[2] == 3
+    assert (image == (248, 0, 0)).all(axis=2).sum() == 120 * 120
+
+def test_bench_baseline():
+    import bench
+
+    # The bus traffic (and other exact counters) must not get any worse
+    # than the baseline. Record a new baseline with
+    # ``make bench BENCH=--update`` after an improvement.
+    baseline = bench.load_baseline()
+    results = {}
+    for (name, fn) in bench.discover():
+        results[name] = bench.run(fn, min_time=0)
+        assert name in baseline, name
+        assert bench.exact(results[name]) == bench.exact(baseline[name]), name
+
+    # Host speed is too noisy to check here (use make bench for that)
+    assert bench.compare(results, baseline, tolerance=1) == []
+
+# Week 0 contains the 1st of January (and is only a whole week if the
+# year starts on a Monday)
+@pytest.mark.parametrize("date,week",
+        (((2024, 1, 1), 0), ((2024, 1, 7), 0), ((2024, 1, 8), 1),
+         ((2026, 1, 1), 0), ((2026, 1, 4), 0), ((2026, 1, 5), 1),
+         ((2026, 1, 12), 2), ((2026, 12, 31), 52)))
+def test_week(date, week):
+    import steplogger
+    import time
+
+    t = time.localtime(time.mktime(date + (12, 0, 0, 0, 0, -1)))
+    assert steplogger._week(t) == week
+
+def test_steprecord():
+    import steprecord
+
+    samples = [0] * 5 + [1, 200, 70000] + [0] * 22
+    rec = steprecord.encode(300, 7, samples)
+    day = [9] * steprecord.DAY_LENGTH
+    assert steprecord.decode(rec + b'\x01', 0, day) == (300, 7, len(rec))
+    assert day[7*30:] == samples and day[:7*30] == [9] * (7*30)
+
+    # Records for other days are skipped over (without being stored)
+    assert steprecord.decode(rec, 0, day, 299) == (300, 7, len(rec))
+    with pytest.raises(IndexError):
+        steprecord.decode(rec[:-1])
+
+def test_steplog_append(tmp_path):
+    from tools import steplog
+
+    # Refuse to append to anything that isn't a step log
+    fname = str(tmp_path / '2021.steps')
+    with open(fname, 'wb') as f:
+        f.write(bytes(range(16)) * 100)
+    with pytest.raises(ValueError):
+        steplog.append(fname, 1, [1] * 10)
+    with open(fname, 'rb') as f:
+        assert f.read() == bytes(range(16)) * 100
@@ -1,13 +1,9 @@
 # SPDX-License-Identifier: LGPL-3.0-or-later
 # Copyright (C) 2020 Daniel Thompson
 
+# Importing simclock makes the time module follow the simulated clock
+import simclock
 import time
-def sleep_ms(ms):
-    time.sleep(ms / 1000)
-time.sleep_ms = sleep_ms
-time.ticks_ms = lambda : int(time.time() * 1000)
-time.ticks_us = lambda : int(time.time() * 1000 * 1000)
-time.ticks_diff = lambda x, y : x-y
 
 import sys, traceback
 def print_exception(exc, file=sys.stdout):
@@ -124,7 +120,7 @@ class RTC(object):
         #if self.uptime < 60:
         #    # Jump back a little over a day
         #    return time.localtime(time.time() - 100000)
-        return time.localtime()[:8]
+        return time.localtime(time.time())[:8]
 
     def get_time(self):
         now = self.get_localtime()
@@ -7,6 +7,7 @@
 
 import array
 import fonts.sans24
+import gc
 import math
 import micropython
 
@@ -62,6 +63,69 @@ def _clut8_rgb565(i: int) -> int:
 
     return rgb565
 
+@micropython.viper
+def _rle2bit_decode(rle, buf, palette, state) -> int:
+    """Decode 2-bit RLE data until buf is full (or the data runs out).
+
+    The decoder is resumable; the row length, data length, read offset,
+    pending run length, pixel value, next palette entry and escape mode
+    are all kept in state. The palette must already be byte-swapped so
+    that its entries can be copied straight into the buffer.
+
+    :returns: The number of pixels written into buf
+    """
+    src = ptr8(rle)
+    dst = ptr16(buf)
+    pal = ptr16(palette)
+    st = ptr32(state)
+
+    sz = int(st[0])
+    n = int(st[1])
+    i = int(st[2])
+    rl = int(st[3])
+    px = int(st[4])
+    nc = int(st[5])
+    mode = int(st[6])
+    bp = 0
+
+    while True:
+        if mode == 0:
+            c = int(pal[px])
+            while rl > 0 and bp < sz:
+                dst[bp] = c
+                bp += 1
+                rl -= 1
+        if bp >= sz or i >= n:
+            break
+
+        op = int(src[i])
+        i += 1
+        if mode == 2:
+            # Palette reprogramming escape
+            c = int(_clut8_rgb565(op))
+            pal[nc] = ((c >> 8) & 0xff) + ((c & 0xff) << 8)
+            nc = nc + 1 if nc < 3 else 1
+            mode = 0
+        elif mode == 1:
+            # Extended run length
+            rl += op
+            if op < 255:
+                mode = 0
+        else:
+            px = op >> 6
+            rl = op & 0x3f
+            if rl == 0:
+                mode = 2
+            elif rl >= 63:
+                mode = 1
+
+    st[2] = i
+    st[3] = rl
+    st[4] = px
+    st[5] = nc
+    st[6] = mode
+    return bp
+
 @micropython.viper
 def _fill(mv, color: int, count: int, offset: int):
     p = ptr16(mv)
@@ -70,6 +134,29 @@ def _fill(mv, color: int, count: int, offset: int):
     for x in range(offset, offset+count):
         p[x] = color
 
+_span_tables = {}
+
+def _span_table(r):
+    """Get the half-widths, indexed by row offset, of a disc of radius r.
+
+    The tables are cached (a handful at a time) because gauges and ring
+    indicators tend to be redrawn over and over with the same radius.
+    """
+    table = _span_tables.get(r)
+    if table is None:
+        if len(_span_tables) >= 8:
+            _span_tables.clear()
+        r2 = r * r
+        table = array.array('H', (int(math.sqrt(r2 - v*v) + 0.5)
+                                  for v in range(r+1)))
+        _span_tables[r] = table
+    return table
+
+def _angle(u, v):
+    """Navigational angle (in degrees) of a point relative to the origin."""
+    a = math.atan2(u, -v) * 180 / math.pi
+    return a + 360 if a < 0 else a
+
 def _bounding_box(s, font):
     if not s:
         return (0, font.height())
@@ -86,26 +173,190 @@ def _bounding_box(s, font):
 def _draw_glyph(display, glyph, x, y, bgfg):
     (px, h, w) = glyph
 
-    buf = display.linebuffer[0:2*(w+1)]
-    buf[2*w] = bgfg >> 24
-    buf[2*w + 1] = (bgfg >> 16) & 0xff
+    # Expand as many rows as will fit into one buffer whilst the other
+    # one is being sent
+    stride = 2 * (w+1)
+    rows = min(h, len(display.linebuffer) // stride)
+    if not rows:
+        # The line buffer cannot hold even one row of the glyph
+        display.set_window(x, y, w+1, h)
+        display.write_data(_render_glyph(glyph, bgfg))
+        return
+    (buf, spare) = display.linebuffers
+    buf = buf[0:stride*rows]
+    spare = spare[0:stride*rows]
+    bg_hi = bgfg >> 24
+    bg_lo = (bgfg >> 16) & 0xff
+    for offset in range(stride - 2, stride*rows, stride):
+        buf[offset] = bg_hi
+        buf[offset + 1] = bg_lo
+        spare[offset] = bg_hi
+        spare[offset + 1] = bg_lo
     bytes_per_row = (w + 7) // 8
 
     display.set_window(x, y, w+1, h)
     quick_write = display.quick_write
 
     display.quick_start()
-    for row in range(h):
-        _bitblit(buf, px[row*bytes_per_row:], bgfg, w)
-        quick_write(buf)
+    row = 0
+    while row < h:
+        n = min(rows, h - row)
+        for i in range(n):
+            _bitblit(buf[i*stride:], px[(row+i)*bytes_per_row:], bgfg, w)
+        quick_write(buf if n == rows else buf[0:stride*n])
+        (buf, spare) = (spare, buf)
+        row += n
     display.quick_end()
 
+@micropython.native
+def _render_glyph(glyph, bgfg):
+    """Expand a glyph (and its spacing column) into RGB565 pixels."""
+    (px, h, w) = glyph
+
+    stride = 2 * (w+1)
+    buf = memoryview(bytearray(stride * h))
+    bg_hi = bgfg >> 24
+    bg_lo = (bgfg >> 16) & 0xff
+    bytes_per_row = (w + 7) // 8
+
+    for row in range(h):
+        offset = row * stride
+        _bitblit(buf[offset:], px[row*bytes_per_row:], bgfg, w)
+        buf[offset + 2*w] = bg_hi
+        buf[offset + 2*w + 1] = bg_lo
+
+    return buf
+
+def _cached_glyph(cache, font, ch, bgfg):
+    """Fetch the pixels for a glyph from the cache, rendering on a miss."""
+    key = (font, ch, bgfg)
+    px = cache.get(key)
+    if px is None:
+        px = _render_glyph(font.get_ch(ch), bgfg)
+        cache.put(key, px)
+    return px
+
+class RasterCache(object):
+    """Bounded LRU cache of pre-rendered RGB565 pixel data.
+
+    Entries are evicted, least recently used first, whenever adding a new
+    entry would take the cache over its byte budget. The hit and miss
+    counters can be used to tune the budget.
+
+    If a ``reserve`` is given then the cache also yields to the rest of
+    the system: when adding an entry would leave less than ``reserve``
+    bytes of free heap the whole cache is discarded and, if the heap is
+    still too tight, the new entry is refused.
+
+    Example:
+
+    .. code-block:: python
+
+        draw = wasp.watch.drawable
+        draw.glyph_cache = draw565.RasterCache(4096)
+
+    .. automethod:: __init__
+    """
+
+    def __init__(self, budget=2048, reserve=0):
+        """Create an empty cache.
+
+        :param int budget:  Maximum number of bytes of pixel data to retain
+        :param int reserve: Free heap, in bytes, to leave for the rest of the
+                            system (0 to disable the check)
+        """
+        self.budget = budget
+        self.reserve = reserve
+        self.hits = 0
+        self.misses = 0
+        self.clear()
+
+    def clear(self):
+        """Discard every entry in the cache."""
+        self.used = 0
+        self._data = {}
+        self._lru = []
+
+    def get(self, key):
+        """Look up an entry, updating the hit/miss counters.
+
+        :returns: The pixel data, or None if the key is not cached
+        """
+        data = self._data.get(key)
+        if data is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        lru = self._lru
+        if lru[-1] != key:
+            lru.remove(key)
+            lru.append(key)
+        return data
+
+    def put(self, key, data):
+        """Add an entry, evicting older entries if needed.
+
+        :returns: True if the data was cached, False if it is too big
+        """
+        # Replacing an entry must not count it twice
+        old = self._data.pop(key, None)
+        if old is not None:
+            self._lru.remove(key)
+            self.used -= len(old)
+
+        sz = len(data)
+        if not self.room(sz):
+            return False
+
+        self._data[key] = data
+        self._lru.append(key)
+        self.used += sz
+        return True
+
+    def room(self, sz):
+        """Make room for a new entry of ``sz`` bytes.
+
+        This can be called before the data for an entry is allocated to
+        avoid building data that will not be kept.
+
+        :returns: True if an entry of this size can be cached
+        """
+        if sz > self.budget:
+            return False
+
+        while self.used + sz > self.budget:
+            self.evict()
+
+        if self.reserve:
+            mem_free = getattr(gc, 'mem_free', None)
+            if mem_free and mem_free() < self.reserve + sz:
+                self.clear()
+                gc.collect()
+                if mem_free() < self.reserve + sz:
+                    return False
+        return True
+
+    def evict(self):
+        """Discard the least recently used entry."""
+        key = self._lru.pop(0)
+        self.used -= len(self._data.pop(key))
+
 class Draw565(object):
     """Drawing library for RGB565 displays.
 
     A full framebufer is not required although the library will
     'borrow' a line buffer from the underlying display driver.
 
+    Text rendering can optionally be accelerated by assigning a
+    :py:class:`.RasterCache` to ``glyph_cache``. Cached glyphs are sent
+    to the display without needing to be expanded again.
+
+    Likewise assigning a :py:class:`.RasterCache` to ``image_cache``
+    keeps the decoded pixels for recently blitted 2-bit RLE images
+    (icons, buttons, etc). Images are cached by identity together with
+    their colours so this works best for images that live in flash.
+
     .. automethod:: __init__
     """
 
@@ -116,6 +367,8 @@ class Draw565(object):
         and 24pt Sans Serif text.
         """
         self._display = display
+        self.glyph_cache = None
+        self.image_cache = None
         self.reset()
 
     def reset(self):
@@ -150,6 +403,13 @@ class Draw565(object):
         if h is None:
             h = display.height - y
 
+        # A window cannot straddle the point where a scrolled display wraps
+        wrap = display.height - display.scroll_offset
+        if y < wrap < y + h:
+            self.fill(bg, x, y, w, wrap - y)
+            h -= wrap - y
+            y = wrap
+
         remaining = w * h
         if remaining == 0:
           return
@@ -169,6 +429,36 @@ class Draw565(object):
             quick_write(buf[0:2*remaining])
         display.quick_end()
 
+    def scroll(self, dy, bg=None):
+        """Scroll the contents of the display vertically.
+
+        The display hardware is used to move the existing frame so only
+        the newly exposed strip needs to be drawn. The strip is filled with
+        the background colour, ready for the caller to draw into.
+
+        The scroll position is absolute (it is not reset when the display is
+        redrawn) so applications that scroll must either scroll back or
+        leave the system to reset it when switching applications. Whilst the
+        display is scrolled :py:meth:`.fill` copes with any rectangle but
+        strings and images must not straddle the row at ``display.height -
+        display.scroll_offset``.
+
+        :param dy: Number of pixels to move the contents of the display up
+                   by, negative values move the contents down
+        :param bg: Background colour for the exposed strip, defaults to the
+                   current background colour
+        """
+        display = self._display
+        h = display.height
+        display.scroll((display.scroll_offset + dy) % h)
+        if dy >= h or -dy >= h:
+            # Everything has scrolled off the display
+            self.fill(bg)
+        elif dy > 0:
+            self.fill(bg, 0, h - dy, None, dy)
+        elif dy < 0:
+            self.fill(bg, 0, 0, None, -dy)
+
     @micropython.native
     def blit(self, image, x, y, fg=0xffff, c1=0x4a69, c2=0x7bef):
         """Decode and draw an encoded image.
@@ -227,50 +517,54 @@ class Draw565(object):
         sy = image[2]
         rle = memoryview(image)[3:]
 
-        display.set_window(x, y, sx, sy)
-
-        if sx <= (len(display.linebuffer) // 4) and not bool(sy & 1):
-            sx *= 2
-            sy //= 2
-
+        # The palette is byte-swapped ready to be copied into the buffer
         palette = array.array('H', (0, c1, c2, fg))
-        next_color = 1
-        rl = 0
-        buf = display.linebuffer[0:2*sx]
-        bp = 0
+        for i in range(1, 4):
+            c = palette[i]
+            palette[i] = ((c >> 8) + (c << 8)) & 0xffff
 
-        display.quick_start()
-        for op in rle:
-            if rl == 0:
-                px = op >> 6
-                rl = op & 0x3f
-                if 0 == rl:
-                    rl = -1
-                    continue
-                if rl >= 63:
-                    continue
-            elif rl > 0:
-                rl += op
-                if op >= 255:
-                    continue
-            else:
-                palette[next_color] = _clut8_rgb565(op)
-                if next_color < 3:
-                    next_color += 1
-                else:
-                    next_color = 1
-                rl = 0
-                continue
+        display.set_window(x, y, sx, sy)
 
-            while rl:
-                count = min(sx - bp, rl)
-                _fill(buf, palette[px], count, bp)
-                bp += count
-                rl -= count
+        cache = self.image_cache
+        if cache and isinstance(image, bytes):
+            # The image itself forms part of the key. Lookups compare by
+            # identity first so this is cheap but, unlike id(), it cannot
+            # be fooled by a new image re-using the address of an old one.
+            # Mutable images are never cached.
+            key = (image, fg, c1, c2)
+            px = cache.get(key)
+            if px is None and cache.room(2 * sx * sy):
+                try:
+                    px = memoryview(bytearray(2 * sx * sy))
+                except MemoryError:
+                    cache.clear()
+                if px is not None:
+                    state = array.array('I', (sx*sy, len(rle), 0, 0, 0, 1, 0))
+                    _rle2bit_decode(rle, px, palette, state)
+                    cache.put(key, px)
+            if px is not None:
+                display.write_data(px)
+                return
+
+        # The decoder fills one buffer whilst the other is being sent. The
+        # pixels form a continuous stream so the buffers need not hold
+        # whole rows.
+        sz = min(sx * sy, len(display.linebuffer) // 2)
+        state = array.array('I', (sz, len(rle), 0, 0, 0, 1, 0))
+        (buf, spare) = display.linebuffers
+        buf = buf[0:2*sz]
+        spare = spare[0:2*sz]
 
-                if bp >= sx:
-                    quick_write(buf)
-                    bp = 0
+        display.quick_start()
+        while True:
+            n = _rle2bit_decode(rle, buf, palette, state)
+            if n == sz:
+                quick_write(buf)
+            elif n:
+                quick_write(buf[0:2*n])
+            if n < sz or not n:
+                break
+            (buf, spare) = (spare, buf)
         display.quick_end()
 
     def set_color(self, color, bg=0):
@@ -312,25 +606,84 @@ class Draw565(object):
         font = self._font
         bg = self._bgfg >> 16
 
+        (w, h) = _bounding_box(s, font)
+        leftpad = 0
+        rightpad = 0
         if width:
-            (w, h) = _bounding_box(s, font)
             if right:
                 leftpad = width - w
-                rightpad = 0
             else:
                 leftpad = (width - w) // 2
                 rightpad = width - w - leftpad
+
+        # Whenever a row of the string (and its padding) fits in the line
+        # buffer we can send the whole thing using a single window
+        total = leftpad + w + rightpad
+        if leftpad >= 0 and rightpad >= 0 and \
+                2 * total <= len(display.linebuffer):
+            if total:
+                self._string(s, x, y, leftpad, total, h)
+            return
+
+        if width:
             self.fill(bg, x, y, leftpad, h)
             x += leftpad
 
+        cache = self.glyph_cache
         for ch in s:
             glyph = font.get_ch(ch)
-            _draw_glyph(display, glyph, x, y, bgfg)
+            if cache:
+                px = _cached_glyph(cache, font, ch, bgfg)
+                display.set_window(x, y, glyph[2] + 1, glyph[1])
+                display.write_data(px)
+            else:
+                _draw_glyph(display, glyph, x, y, bgfg)
             x += glyph[2] + 1
 
         if width:
             self.fill(bg, x, y, rightpad, h)
 
+    @micropython.native
+    def _string(self, s, x, y, leftpad, total, h):
+        """Stream a string, row by row, through a single display window."""
+        display = self._display
+        bgfg = self._bgfg
+        font = self._font
+        cache = self.glyph_cache
+
+        if cache:
+            glyphs = [_cached_glyph(cache, font, ch, bgfg) for ch in s]
+        else:
+            glyphs = [font.get_ch(ch) for ch in s]
+
+        # The padding and the spacing between the glyphs are the same on
+        # every row so we only need to fill them once (for each of the
+        # buffers that we alternate between)
+        (buf, spare) = display.linebuffers
+        buf = buf[0:2*total]
+        spare = spare[0:2*total]
+        _fill(buf, bgfg >> 16, total, 0)
+        _fill(spare, bgfg >> 16, total, 0)
+
+        quick_write = display.quick_write
+        display.set_window(x, y, total, h)
+        display.quick_start()
+        for row in range(h):
+            offset = 2 * leftpad
+            if cache:
+                for px in glyphs:
+                    stride = len(px) // h
+                    start = row * stride
+                    buf[offset:offset+stride] = px[start:start+stride]
+                    offset += stride
+            else:
+                for (px, _, w) in glyphs:
+                    _bitblit(buf[offset:], px[row*((w+7)//8):], bgfg, w)
+                    offset += 2 * (w+1)
+            quick_write(buf)
+            (buf, spare) = (spare, buf)
+        display.quick_end()
+
     def bounding_box(self, s):
         """Return the bounding box of a string.
 
@@ -410,9 +763,43 @@ class Draw565(object):
         """
         if color is None:
             color = self._bgfg & 0xffff
-        px = bytes(((color >> 8) & 0xFF, color & 0xFF)) * (width * width)
-        write_data = self._display.write_data
-        set_window = self._display.set_window
+        self._line(x0, y0, x1, y1, width, color)
+
+    def polyline(self, points, width=1, color=None):
+        """Draw a series of connected lines.
+
+        Example:
+
+        .. code-block:: python
+
+            draw = wasp.watch.drawable
+            draw.polyline(((0, 239), (60, 180), (120, 200), (239, 100)))
+
+        :param points: Sequence of (x, y) tuples to join together
+        :param width: Width of the lines in pixels
+        :param color: Colour to draw lines, defaults to the foreground colour
+        """
+        if color is None:
+            color = self._bgfg & 0xffff
+        line = self._line
+
+        (x0, y0) = points[0]
+        for i in range(1, len(points)):
+            (x1, y1) = points[i]
+            line(x0, y0, x1, y1, width, color)
+            x0 = x1
+            y0 = y1
+
+    @micropython.native
+    def _line(self, x0, y0, x1, y1, width, color):
+        """Rasterize a line as a series of horizontal or vertical spans.
+
+        Consecutive Bresenham steps that share a row (for shallow lines)
+        or a column (for steep lines) are merged into a single filled
+        rectangle, width pixels thick, rather than being drawn as
+        individual width x width squares.
+        """
+        fill = self.fill
 
         dw = (width - 1) // 2
         x0 -= dw
@@ -431,21 +818,204 @@ class Draw565(object):
                 y0, y1 = y1, y0
             w = width if dx == 0 else (dx + width)
             h = width if dy == 0 else (-dy + width)
-            self.fill(color, x0, y0, w, h)
+            fill(color, x0, y0, w, h)
             return
-        while True:
-            set_window(x0, y0, width, width)
-            write_data(px)
-            if x0 == x1 and y0 == y1:
-                break
+
+        shallow = dx >= -dy
+        rx = x0
+        ry = y0
+        px = x0
+        py = y0
+        while x0 != x1 or y0 != y1:
             e2 = 2 * err
             if e2 >= dy:
                 err += dy
                 x0 += sx
             if e2 <= dx:
-                err += dx;
-                y0 += sy;
-        
+                err += dx
+                y0 += sy
+
+            if (shallow and y0 != ry) or (not shallow and x0 != rx):
+                fill(color, min(rx, px), min(ry, py),
+                     abs(px - rx) + width, abs(py - ry) + width)
+                rx = x0
+                ry = y0
+            px = x0
+            py = y0
+
+        fill(color, min(rx, px), min(ry, py),
+             abs(px - rx) + width, abs(py - ry) + width)
+
+    @micropython.native
+    def fill_circle(self, x, y, r, color=None):
+        """Draw a filled circle.
+
+        :param x: X coordinate of the centre of the circle
+        :param y: Y coordinate of the centre of the circle
+        :param r: Radius of the circle
+        :param color: Colour to draw circle, defaults to the foreground colour
+        """
+        if color is None:
+            color = self._bgfg & 0xffff
+        fill = self.fill
+        table = _span_table(r)
+
+        # Rows with the same span are merged into a single rectangle
+        v = -r
+        while v <= r:
+            hw = table[abs(v)]
+            n = 1
+            while v + n <= r and table[abs(v + n)] == hw:
+                n += 1
+            fill(color, x - hw, y + v, 2*hw + 1, n)
+            v += n
+
+    def circle(self, x, y, r, width=1, color=None):
+        """Draw the outline of a circle.
+
+        :param x: X coordinate of the centre of the circle
+        :param y: Y coordinate of the centre of the circle
+        :param r: Outer radius of the circle
+        :param width: Width of the outline in pixels
+        :param color: Colour to draw circle, defaults to the foreground colour
+        """
+        self.arc(x, y, r, 0, 360, width, color)
+
+    @micropython.native
+    def arc(self, x, y, r, start, end, width=1, color=None):
+        """Draw part of the outline of a circle.
+
+        The angles adopt the same navigational conventions as
+        :py:meth:`~.polar`; zero degrees is vertically upwards and angles
+        are measured clockwise.
+
+        Example:
+
+        .. code-block:: python
+
+            # Draw a progress ring that is 30% complete
+            draw = wasp.watch.drawable
+            draw.arc(120, 120, 100, 0, 360 * 30 // 100, 12, 0xfd20)
+
+        :param x: X coordinate of the centre of the circle
+        :param y: Y coordinate of the centre of the circle
+        :param r: Outer radius of the arc
+        :param start: Angle, in degrees, where the arc starts
+        :param end: Angle, in degrees, where the arc ends
+        :param width: Width of the arc in pixels
+        :param color: Colour to draw arc, defaults to the foreground colour
+        """
+        if color is None:
+            color = self._bgfg & 0xffff
+        fill = self.fill
+        outer = _span_table(r)
+        ri = r - width
+        inner = _span_table(ri) if ri >= 0 else None
+
+        if end - start >= 360:
+            sweep = None
+        else:
+            s = start % 360
+            e = end % 360
+            sweep = ((s, e),) if s <= e else ((s, 360), (0, e))
+
+        prev = None
+        count = 0
+        for v in range(-r, r+2):
+            if v > r:
+                spans = None
+            else:
+                av = abs(v)
+                ho = outer[av]
+                if inner and av <= ri:
+                    hi = inner[av]
+                    spans = ((-ho, -hi-1), (hi+1, ho))
+                elif sweep:
+                    spans = ((-ho, -1), (0, ho))
+                else:
+                    spans = ((-ho, ho),)
+                if sweep:
+                    spans = self._arc_clip(spans, v, sweep)
+
+            # Full circles (and rings) merge rows with identical spans
+            if spans == prev:
+                count += 1
+                continue
+            if prev:
+                for (u0, u1) in prev:
+                    fill(color, x + u0, y + v - count, u1 - u0 + 1, count)
+            prev = spans
+            count = 1
+
+    @staticmethod
+    def _arc_clip(spans, v, sweep):
+        """Clip spans (on row v) to the angular ranges of an arc.
+
+        Each span lies entirely to one side of the vertical axis so the
+        angle changes monotonically along it and every angular range maps
+        to a single run of pixels.
+        """
+        clipped = []
+        for (u0, u1) in spans:
+            if u0 > u1:
+                continue
+            if v == 0:
+                a = 90 if u0 >= 0 else 270
+                for (s, e) in sweep:
+                    if s <= a <= e:
+                        clipped.append((u0, u1))
+                        break
+                continue
+
+            a0 = _angle(u0, v)
+            a1 = _angle(u1, v)
+            lo = min(a0, a1)
+            hi = max(a0, a1)
+            for (s, e) in sweep:
+                s = max(s, lo)
+                e = min(e, hi)
+                if s > e:
+                    continue
+                b0 = -v * math.tan(s * math.pi / 180)
+                b1 = -v * math.tan(e * math.pi / 180)
+                c0 = max(u0, math.ceil(min(b0, b1) - 0.000001))
+                c1 = min(u1, math.floor(max(b0, b1) + 0.000001))
+                if c0 <= c1:
+                    clipped.append((c0, c1))
+        return tuple(clipped)
+
+    @micropython.native
+    def round_rect(self, x, y, w, h, r, color=None):
+        """Draw a filled rectangle with rounded corners.
+
+        :param x: X coordinate of the left-most pixels of the rectangle
+        :param y: Y coordinate of the top-most pixels of the rectangle
+        :param w: Width of the rectangle
+        :param h: Height of the rectangle
+        :param r: Radius of the corners
+        :param color: Colour to draw rectangle, defaults to the foreground
+                      colour
+        """
+        if w <= 0 or h <= 0:
+            return
+        if color is None:
+            color = self._bgfg & 0xffff
+        fill = self.fill
+        r = max(0, min(r, (w-1) // 2, (h-1) // 2))
+        table = _span_table(r)
+
+        i = 0
+        while i < r:
+            hw = table[r - i]
+            n = 1
+            while i + n < r and table[r - i - n] == hw:
+                n += 1
+            span = w - 2*r + 2*hw
+            fill(color, x + r - hw, y + i, span, n)
+            fill(color, x + r - hw, y + h - i - n, span, n)
+            i += n
+        fill(color, x, y + r, w, h - 2*r)
+
     def polar(self, x, y, theta, r0, r1, width=1, color=None):
         """Draw a line using polar coordinates.
 
@@ -524,3 +1094,193 @@ class Draw565(object):
         b = bm - step if bm > step else 0
 
         return (r | g | b)
+
+def _intersects(a, b):
+    """Check whether two (x, y, w, h) rectangles overlap."""
+    return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and \
+           a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
+
+def _contains(a, b):
+    """Check whether rectangle a entirely covers rectangle b."""
+    return a[0] <= b[0] and a[1] <= b[1] and \
+           a[0] + a[2] >= b[0] + b[2] and a[1] + a[3] >= b[1] + b[3]
+
+def _clip(a, b):
+    """Return the intersection of two rectangles (or None)."""
+    x = max(a[0], b[0])
+    y = max(a[1], b[1])
+    w = min(a[0] + a[2], b[0] + b[2]) - x
+    h = min(a[1] + a[3], b[1] + b[3]) - y
+    if w <= 0 or h <= 0:
+        return None
+    return (x, y, w, h)
+
+def _merge(rects):
+    """Merge overlapping rectangles until none of them intersect."""
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(rects)):
+            for j in range(i+1, len(rects)):
+                a = rects[i]
+                b = rects[j]
+                if _intersects(a, b):
+                    x = min(a[0], b[0])
+                    y = min(a[1], b[1])
+                    rects[i] = (x, y,
+                                max(a[0] + a[2], b[0] + b[2]) - x,
+                                max(a[1] + a[3], b[1] + b[3]) - y)
+                    del rects[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return rects
+
+class Compositor(object):
+    """Damage tracking front-end for :py:class:`.Draw565`.
+
+    The compositor records the drawing operations that make up a frame
+    rather than sending them straight to the display. When the frame is
+    flushed the operations are compared with those of the previous frame,
+    the rectangles that have changed are merged and only the operations
+    that touch the merged regions are replayed (with fills clipped to the
+    damaged regions).
+
+    A frame should paint every pixel it cares about (typically by starting
+    with a background :py:meth:`~.fill`) since regions that are no longer
+    drawn will only be repainted by the operations that remain.
+
+    Example:
+
+    .. code-block:: python
+
+        comp = draw565.Compositor(wasp.watch.drawable)
+        comp.fill()
+        comp.string('12:34', 0, 108, width=240)
+        comp.flush()
+
+    .. automethod:: __init__
+    """
+
+    def __init__(self, draw):
+        """Wrap a drawing library.
+
+        :param Draw565 draw: The drawing library used to render the frame
+        """
+        self._draw = draw
+        self._ops = []
+        self._prev = []
+        self.reset_counters()
+
+    def reset_counters(self):
+        """Zero the damage tracking statistics."""
+        self.rects_submitted = 0
+        self.rects_flushed = 0
+        self.bytes_sent = 0
+
+    def counters(self):
+        """Report the damage tracking statistics.
+
+        :returns: Tuple of (rects submitted, rects flushed, pixel bytes sent)
+        """
+        return (self.rects_submitted, self.rects_flushed, self.bytes_sent)
+
+    def invalidate(self):
+        """Forget the previous frame so that the next flush redraws it all."""
+        self._prev = []
+
+    def _record(self, rect, op):
+        if rect[2] > 0 and rect[3] > 0:
+            self._ops.append((rect, op))
+            self.rects_submitted += 1
+
+    def fill(self, bg=None, x=0, y=0, w=None, h=None):
+        """Record a solid colour rectangle, see :py:meth:`.Draw565.fill`."""
+        draw = self._draw
+        display = draw._display
+        if bg is None:
+            bg = draw._bgfg >> 16
+        if w is None:
+            w = display.width - x
+        if h is None:
+            h = display.height - y
+        self._record((x, y, w, h), ('f', bg))
+
+    def blit(self, image, x, y, fg=0xffff, c1=0x4a69, c2=0x7bef):
+        """Record an image, see :py:meth:`.Draw565.blit`."""
+        if len(image) == 3:
+            (w, h) = image[0:2]
+        else:
+            w = image[1]
+            h = image[2]
+        self._record((x, y, w, h), ('b', image, fg, c1, c2))
+
+    def string(self, s, x, y, width=None, right=False):
+        """Record a string, see :py:meth:`.Draw565.string`.
+
+        The current font and colours are captured when the string is
+        recorded.
+        """
+        draw = self._draw
+        (w, h) = _bounding_box(s, draw._font)
+        if width:
+            w = width
+        self._record((x, y, w, h),
+                     ('s', s, width, right, draw._font, draw._bgfg))
+
+    def flush(self):
+        """Send the changed regions of the current frame to the display."""
+        ops = self._ops
+        prev = self._prev
+
+        damage = [op[0] for op in ops if op not in prev]
+        damage += [op[0] for op in prev if op not in ops]
+        damage = _merge(damage)
+
+        # Strings and images cannot be clipped so, if they overlap a damaged
+        # region, the region must grow to cover them completely.
+        grown = True
+        while grown:
+            grown = False
+            for (r, op) in ops:
+                if op[0] == 'f':
+                    continue
+                for d in damage:
+                    if _intersects(r, d) and not _contains(d, r):
+                        damage.append(r)
+                        damage = _merge(damage)
+                        grown = True
+                        break
+                if grown:
+                    break
+        self.rects_flushed += len(damage)
+
+        draw = self._draw
+        bgfg = draw._bgfg
+        font = draw._font
+        for (r, op) in ops:
+            kind = op[0]
+            if kind == 'f':
+                for d in damage:
+                    c = _clip(r, d)
+                    if c:
+                        draw.fill(op[1], c[0], c[1], c[2], c[3])
+                        self.bytes_sent += 2 * c[2] * c[3]
+                continue
+
+            for d in damage:
+                if _intersects(r, d):
+                    if kind == 's':
+                        draw._font = op[4]
+                        draw._bgfg = op[5]
+                        draw.string(op[1], r[0], r[1], op[2], op[3])
+                    else:
+                        draw.blit(op[1], r[0], r[1], op[2], op[3], op[4])
+                    self.bytes_sent += 2 * r[2] * r[3]
+                    break
+        draw._bgfg = bgfg
+        draw._font = font
+
+        self._prev = ops
+        self._ops = []
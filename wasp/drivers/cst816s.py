@@ -8,10 +8,24 @@
 import array
 import time
 from machine import Pin
+from micropython import const
+
+# Number of events that can be waiting to be handled
+_RING = const(8)
 
 class CST816S:
     """Hynitron CST816S I2C touch controller driver.
 
+    Events are read from the controller by the interrupt handler and queued
+    in a small ring buffer, along with the time they arrived, so that
+    touches that arrive whilst the system is busy (e.g. during a slow
+    redraw) are not lost. The interrupt handler is the only writer of the
+    head of the ring and :py:meth:`.get_event` is the only writer of the
+    tail so no locking is needed.
+
+    If the ring fills up then new events are discarded and counted in
+    ``overruns``.
+
     .. automethod:: __init__
     """
 
@@ -26,6 +40,12 @@ class CST816S:
         self.schedule = schedule
         self.dbuf = bytearray(6)
         self.event = array.array('H', (0, 0, 0))
+        self.event_ms = 0
+        self.overruns = 0
+        self._ring = array.array('H', [0] * (3 * _RING))
+        self._stamps = [0] * _RING
+        self._head = 0
+        self._tail = 0
 
         self._reset()
         self.tp_int.irq(trigger=Pin.IRQ_FALLING, handler=self.get_touch_data)
@@ -46,19 +66,31 @@ class CST816S:
         """Receive a touch event by interrupt.
 
         Check for a pending touch event and, if an event is pending,
-        prepare it ready to go in the event queue.
+        add it to the event queue.
         """
         dbuf = self.dbuf
-        event = self.event
 
         try:
             self.i2c.readfrom_mem_into(21, 1, dbuf)
         except OSError:
             return None
 
-        event[0] = dbuf[0] # event
-        event[1] = ((dbuf[2] & 0xf) << 8) + dbuf[3] # x coord
-        event[2] = ((dbuf[4] & 0xf) << 8) + dbuf[5] # y coord
+        if dbuf[0]:
+            head = self._head
+            nxt = (head + 1) % _RING
+            if nxt == self._tail:
+                self.overruns += 1
+                return None
+
+            ring = self._ring
+            i = 3 * head
+            ring[i] = dbuf[0] # event
+            ring[i+1] = ((dbuf[2] & 0xf) << 8) + dbuf[3] # x coord
+            ring[i+2] = ((dbuf[4] & 0xf) << 8) + dbuf[5] # y coord
+            self._stamps[head] = time.ticks_ms()
+
+            # Publish the event only once it is complete
+            self._head = nxt
 
         if self.schedule:
             self.schedule(self)
@@ -67,14 +99,30 @@ class CST816S:
         """Receive a touch event.
 
         Check for a pending touch event and, if an event is pending,
-        prepare it ready to go in the event queue.
+        prepare it ready to go in the event queue. The time the event
+        arrived (from time.ticks_ms()) is stored in event_ms.
+
+        The same event is returned until :py:meth:`.reset_touch_data` is
+        called, after which the next event in the queue (if any) is
+        returned.
 
         :return: An event record if an event is received, None otherwise.
         """
-        if self.event[0] == 0:
-            return None
+        event = self.event
+        if event[0] == 0:
+            tail = self._tail
+            if tail == self._head:
+                return None
 
-        return self.event
+            ring = self._ring
+            i = 3 * tail
+            event[0] = ring[i]
+            event[1] = ring[i+1]
+            event[2] = ring[i+2]
+            self.event_ms = self._stamps[tail]
+            self._tail = (tail + 1) % _RING
+
+        return event
 
     def reset_touch_data(self):
         """Reset touch data.
@@ -83,13 +131,18 @@ class CST816S:
         """
         self.event[0] = 0
 
+    def _flush(self):
+        """Discard any events that have not been handled."""
+        self._tail = self._head
+        self.event[0] = 0
+
     def wake(self):
         """Wake up touch controller chip.
 
         Just reset the chip in order to wake it up
         """
         self._reset()
-        self.event[0] = 0
+        self._flush()
 
     def sleep(self):
         """Put touch controller chip on sleep mode to save power.
@@ -104,4 +157,4 @@ class CST816S:
             self.tp_rst.off()
 
         # Ensure get_event() cannot return anything
-        self.event[0] = 0
+        self._flush()
@@ -28,29 +28,55 @@ _DISPON             = const(0x29)
 _CASET              = const(0x2a)
 _RASET              = const(0x2b)
 _RAMWR              = const(0x2c)
+_VSCRDEF            = const(0x33)
 _COLMOD             = const(0x3a)
 _MADCTL             = const(0x36)
+_VSCSAD             = const(0x37)
+
+# The controller has enough RAM for 240x320 pixels
+_RAM_HEIGHT         = const(320)
 
 class ST7789(object):
     """Sitronix ST7789 display driver
 
+    .. data:: linebuffers
+
+        A pair of buffers, each ``rows`` rows deep, that can be used to
+        prepare pixels for the display. Drawing code that fills one buffer
+        whilst the other is being sent should alternate between the pair
+        since a buffer passed to ``quick_write()`` may still be being read
+        (e.g. by DMA) until the next call to ``quick_write()`` or
+        :py:meth:`.quick_end`.
+
+    .. data:: linebuffer
+
+        The first of the :py:data:`.linebuffers`.
+
     .. automethod:: __init__
     """
-    def __init__(self, width, height):
+    def __init__(self, width, height, rows=1):
         """Configure the size of the display.
 
         :param int width: Display width, in pixels
         :param int height: Display height in pixels
+        :param int rows: Depth of each line buffer, in rows. Deeper buffers
+                         allow data to be sent in fewer, larger, transfers
+                         but use more RAM.
         """
         self.width = width
         self.height = height
-        self.linebuffer = memoryview(bytearray(2 * width))
+        self.linebuffers = (memoryview(bytearray(2 * width * rows)),
+                            memoryview(bytearray(2 * width * rows)))
+        self.linebuffer = self.linebuffers[0]
         self.window = bytearray(4)
         self.init_display()
 
     def init_display(self):
         """Reset and initialize the display."""
         self.reset()
+        self.scroll_offset = 0
+        h = self.height
+        b = _RAM_HEIGHT - h
 
         self.write_cmd(_SLPOUT)
         sleep_ms(10)
@@ -61,6 +87,8 @@ class ST7789(object):
             #(_INVOFF,   None), # Results in odd palette
             (_INVON,   None),
             (_NORON,   None),
+            # The whole of the visible display forms the scroll area
+            (_VSCRDEF, bytes((0, 0, h >> 8, h & 0xff, b >> 8, b & 0xff))),
         ):
             self.write_cmd(cmd[0])
             if cmd[1]:
@@ -106,11 +134,36 @@ class ST7789(object):
         else:
             self.write_cmd(_DISPON)
 
+    def scroll(self, offset):
+        """Set the vertical scroll offset.
+
+        Scrolling moves the contents of the display up by ``offset`` pixels
+        without having to redraw it. The rows that scroll off the top of the
+        display reappear at the bottom.
+
+        Coordinates passed to :py:meth:`.set_window` are always relative to
+        the visible display (the driver translates them to match the scroll
+        offset) but a window that straddles the bottom of the visible display
+        and the wrapped rows above it cannot be expressed to the controller.
+        Such windows must be split by the caller.
+
+        :param int offset: Number of pixels to scroll by, from 0 to
+                           height - 1
+        """
+        self.scroll_offset = offset
+        self.write_cmd(_VSCSAD)
+        window = self.window
+        window[0] = offset >> 8
+        window[1] = offset & 0xff
+        self.write_data(memoryview(window)[0:2])
+
     @micropython.native
     def set_window(self, x, y, width, height):
         """Set the clipping rectangle.
 
         All writes to the display will be wrapped at the edges of the rectangle.
+        If the display is scrolled then the rectangle is translated to match
+        (see :py:meth:`.scroll`).
 
         :param x:  X coordinate of the left-most pixels of the rectangle
         :param y:  Y coordinate of the top-most pixels of the rectangle
@@ -123,6 +176,12 @@ class ST7789(object):
         window = self.window
         write_data = self.write_data
 
+        offset = self.scroll_offset
+        if offset:
+            y += offset
+            if y >= self.height:
+                y -= self.height
+
         xp = x + width - 1
         yp = y + height - 1
 
@@ -176,15 +235,18 @@ class ST7789(object):
             h = self.height - y
         self.set_window(x, y, w, h)
 
-        # Populate the line buffer
-        buf = self.linebuffer[0:2*w]
-        for xi in range(0, 2*w, 2):
+        # Populate the line buffer with as many whole rows as will fit
+        rows = min(h, len(self.linebuffer) // (2*w))
+        buf = self.linebuffer[0:2*w*rows]
+        for xi in range(0, len(buf), 2):
             buf[xi] = bg >> 8
             buf[xi+1] = bg & 0xff
 
         # Do the fill
-        for yi in range(h):
+        for yi in range(h // rows):
             self.write_data(buf)
+        if h % rows:
+            self.write_data(buf[0:2*w*(h % rows)])
 
 class ST7789_SPI(ST7789):
     """
@@ -195,7 +257,8 @@ class ST7789_SPI(ST7789):
         :param bytes-like buf: Data, must be in a form that can be directly
                                consumed by the SPI bus.
     """
-    def __init__(self, width, height, spi, cs, dc, res=None, rate=8000000):
+    def __init__(self, width, height, spi, cs, dc, res=None, rate=8000000,
+                 rows=1):
         """Configure the display.
 
         :param int width: Width of the display
@@ -207,6 +270,7 @@ class ST7789_SPI(ST7789):
         :param machine.Pin res: Pin (or signal) to, optionally, use to reset
                                 the display.
         :param int rate: SPI bus frequency
+        :param int rows: Depth of the line buffers, in rows
         """
         self.quick_write = spi.write
         self.cs = cs.value
@@ -221,7 +285,7 @@ class ST7789_SPI(ST7789):
         if res:
             res.init(res.OUT, value=0)
 
-        super().__init__(width, height)
+        super().__init__(width, height, rows)
 
     def reset(self):
         """Reset the display.
@@ -26,6 +26,7 @@ class TouchButton:
         self.tp_rst = rst
         self.schedule = schedule
         self.event = array.array('H', (0, 0, 0))
+        self.event_ms = 0
 
         self._reset()
         self.tp_int.irq(trigger=Pin.IRQ_FALLING, handler=self.get_touch_data)
@@ -42,6 +43,7 @@ class TouchButton:
         """Synthesize a right swipe during interrupt.
         """
         self.event[0] = 253 # NEXT
+        self.event_ms = time.ticks_ms()
 
         if self.schedule:
             self.schedule(self)
@@ -0,0 +1,207 @@
+# SPDX-License-Identifier: LGPL-3.0-or-later
+# Copyright (C) 2026 agent
+
+"""Log synchronization
+~~~~~~~~~~~~~~~~~~~~~~
+
+Stream the step and heart rate logs to the host in a single command.
+This is normally driven by ``wasptool --sync <dir>`` (see
+tools/logsync.py for the host side).
+
+Each frame is printed on its own line as ``#L`` followed by the frame
+encoded as base64. This keeps the frames safe to send over the REPL
+whilst the prefix allows the host to skip anything else the REPL prints.
+A frame is:
+
+.. code-block::
+
+    0     u8 type
+    1     u8 reserved (zero)
+    2     u16 length of the payload
+    4     u32 offset
+    8     payload
+    ...   u32 CRC-32 of everything above
+
+The frame types are:
+
+* ``F``: start of a file. The offset is where the data will start and the
+  payload is the u32 size of the file, the u32 modification time, the u32
+  size of the header (see below) and the filename.
+* ``D``: data from the file at offset.
+* ``E``: end of a file. The offset is the size of the file and the
+  payload is the u32 CRC-32 of the whole file.
+* ``Z``: end of the sync. The offset is the time on the watch (which the
+  host should pass back as ``since`` next time).
+
+Files are resent from where the host left off. The host passes, for each
+file, the offset it has reached together with the CRC-32 of the data it
+already has. Some files (e.g. the step log) also change their header in
+place so, for these, the header is always resent and is not included in
+the CRC.
+"""
+
+import array
+import os
+import wasp
+
+from micropython import const
+
+try:
+    from binascii import b2a_base64, crc32
+except ImportError:
+    from binascii import b2a_base64
+    crc32 = None
+
+_CHUNK = const(96)
+
+# Files that change their header in place (by magic number). None means
+# the whole file can change.
+_HEADERS = {
+    b'STP1': 8 + 4 * 366,
+    b'STT1': None,
+}
+
+_table = None
+
+def _crc32(data, crc=0):
+    """Calculate a CRC-32 (for ports without binascii.crc32)."""
+    global _table
+    if not _table:
+        _table = array.array('I', (0,) * 256)
+        for i in range(256):
+            c = i
+            for j in range(8):
+                c = (c >> 1) ^ 0xedb88320 if c & 1 else c >> 1
+            _table[i] = c
+
+    crc ^= 0xffffffff
+    for b in data:
+        crc = _table[(crc ^ b) & 0xff] ^ (crc >> 8)
+    return crc ^ 0xffffffff
+
+if not crc32:
+    crc32 = _crc32
+
+def files():
+    """List the log files.
+
+    :returns: List of filenames
+    """
+    names = []
+    try:
+        for name in sorted(os.listdir('logs')):
+            fname = 'logs/' + name
+            if os.stat(fname)[0] & 0x4000:
+                for day in sorted(os.listdir(fname)):
+                    if day.endswith('.steps'):
+                        names.append(fname + '/' + day)
+            elif name.endswith('.steps') or name.endswith('.total'):
+                names.append(fname)
+    except OSError:
+        pass
+
+    try:
+        os.stat('hrs.data')
+        names.append('hrs.data')
+    except OSError:
+        pass
+
+    return names
+
+def _word(v):
+    return array.array('I', (v,))
+
+def _frame(write, kind, offset, payload=b''):
+    frame = bytearray(8)
+    frame.extend(payload)
+    n = len(frame) - 8
+    frame[0] = ord(kind)
+    frame[2] = n & 0xff
+    frame[3] = n >> 8
+    frame[4:8] = _word(offset)
+    frame.extend(_word(crc32(frame)))
+    write('#L' + b2a_base64(frame).decode().strip())
+
+def _crc_range(f, buf, start, end):
+    """Calculate the CRC-32 of part of a file."""
+    crc = 0
+    f.seek(start)
+    while start < end:
+        n = f.readinto(buf)
+        if not n:
+            break
+        n = min(n, end - start)
+        crc = crc32(memoryview(buf)[0:n], crc)
+        start += n
+    return crc
+
+def _send_range(write, f, buf, start, end):
+    f.seek(start)
+    while start < end:
+        n = f.readinto(buf)
+        if not n:
+            break
+        n = min(n, end - start)
+        _frame(write, 'D', start, memoryview(buf)[0:n])
+        start += n
+
+def send_file(fname, offset=0, crc=0, write=print):
+    """Send a single file.
+
+    :param fname: The file to send
+    :param offset: Offset the host has already reached
+    :param crc: CRC-32 of the data the host already has (excluding any
+                header)
+    :param write: Function used to output each frame
+    """
+    st = os.stat(fname)
+    size = st[6]
+    buf = bytearray(_CHUNK)
+
+    with open(fname, 'rb') as f:
+        header = _HEADERS.get(f.read(4), 0)
+        if header is None or header > size:
+            header = size
+
+        # Only resume if the host's copy matches ours
+        if offset < header or offset > size or \
+                _crc_range(f, buf, header, offset) != crc:
+            offset = 0
+
+        payload = bytearray()
+        for v in (size, st[8], header):
+            payload.extend(_word(v))
+        payload.extend(fname.encode())
+        _frame(write, 'F', offset, payload)
+
+        if offset:
+            _send_range(write, f, buf, 0, header)
+        _send_range(write, f, buf, offset, size)
+
+        _frame(write, 'E', size, _word(_crc_range(f, buf, 0, size)))
+
+def send(since=0, resume={}, write=print):
+    """Send every log file that has changed.
+
+    :param since: Time of the last sync (as reported by the watch);
+                  files that have not been modified since then are
+                  skipped
+    :param resume: Dictionary, indexed by filename, of (offset, crc)
+                   tuples describing the data the host already has
+    :param write: Function used to output each frame
+    """
+    try:
+        import writeback
+        writeback.sync()
+    except ImportError:
+        pass
+
+    now = int(wasp.watch.rtc.time())
+    for fname in files():
+        mtime = os.stat(fname)[8]
+        if since and mtime and mtime < since and fname in resume:
+            continue
+        (offset, crc) = resume.get(fname, (0, 0))
+        send_file(fname, offset, crc, write)
+
+    _frame(write, 'Z', now)
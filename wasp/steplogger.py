@@ -4,63 +4,234 @@
 """Step logger
 ~~~~~~~~~~~~~~
 
-Capture and record data from the step counter
+Capture and record data from the step counter.
+
+The step counts are sampled every six minutes and recorded in one file per
+year, ``logs/<yyyy>.steps``. The file starts with an index of the days of
+the year so finding a day takes a single seek:
+
+.. code-block::
+
+    0     b'STP1'
+    4     u32 end: length of the valid data (the commit marker)
+    8     u32[366]: offset of the first record for each day (0 if none)
+    1472  records...
+
+New records are appended at ``end`` and ``end`` is only updated once the
+record has been written, so a record that was torn by a crash (or a flat
+battery) is ignored and later overwritten. Records are written using a
+:py:class:`writeback.Journal` so they are batched up in RAM and written
+to the flash roughly a page at a time.
+
+Each record holds one dump (three hours of samples) as a sequence of
+unsigned LEB128 varints: the day of the year (1-366), the dump number
+within the day and then the samples. A sample value v is stored as
+``v << 1`` and a run of n empty samples as ``(n << 1) | 1``. The records
+are encoded and decoded by :py:mod:`steprecord`.
+
+Older versions of wasp-os stored each day in its own file,
+``logs/<yyyy>/<mm>-<dd>.steps``, as raw 16-bit samples. These files are
+still read if there is no data for that day in the new format and
+tools/steplog.py can be used to migrate them.
+
+The totals for each day, week (starting on Monday) and month are kept in
+a second file, ``logs/<yyyy>.total``, so they can be found without
+decoding the samples:
+
+.. code-block::
+
+    0     b'STT1'
+    4     u32 end (only used to detect a torn update)
+    8     u32[366]: daily totals
+    1472  u32[54]: weekly totals
+    1688  u32[12]: monthly totals
+
+Week 0 is the week that contains the 1st of January so it is only a
+whole week if the year starts on a Monday. Otherwise it holds the days
+before the first Monday and week 1 starts on that Monday.
+
+The totals are updated as each dump is recorded. If the file is missing
+it is rebuilt from the step log the first time it is needed.
+
+Both files are repaired before they are written to. A file with the
+wrong magic number is moved out of the way (to ``<fname>.bad``) and
+replaced. If a flush was interrupted whilst it was changing the header
+(see :py:mod:`writeback`) then the index is rebuilt from the records or,
+for the totals file, the whole file is rebuilt.
 """
 
 import array
 import os
+import steprecord
 import time
 import wasp
+import writeback
 
 from micropython import const
+from steprecord import DUMP_LENGTH, DAY_LENGTH
 
 TICK_PERIOD = const(6 * 60)
-DUMP_LENGTH = const(30)
-DUMP_PERIOD = const(DUMP_LENGTH * TICK_PERIOD)
+DUMP_PERIOD = DUMP_LENGTH * TICK_PERIOD
+
+_MAGIC = b'STP1'
+_INDEX = const(8)
+_HEADER = const(_INDEX + 4 * 366)
+
+_TOTALS_MAGIC = b'STT1'
+
+#: Index of the first daily total in the totals file
+DAILY = const(0)
+#: Index of the first weekly total in the totals file
+WEEKLY = const(366)
+#: Index of the first monthly total in the totals file
+MONTHLY = const(WEEKLY + 54)
+_TOTALS = const(MONTHLY + 12)
+
+# Longest time a record may wait in RAM before it is written to the flash
+# (the logs are also written out every time the watch goes to sleep)
+_MAX_AGE = const(12 * 60 * 60)
+
+# Worst case size of the records for a single day
+_MAX_DAY = (DAY_LENGTH // DUMP_LENGTH) * steprecord.MAX_RECORD
+
+def _decode(buf, doy, samples):
+    """Decode the records for a day into samples.
+
+    The records for a day are normally next to each other but records
+    for earlier days can be found between them (if old data was added to
+    the log after the day started) so these are skipped.
+
+    :param buf: The records, starting at the first record for the day
+    :param int doy: Day of the year
+    :param samples: Array of DAY_LENGTH samples to fill in
+    :returns: The offset of the first record that has not been decoded
+              (or 0 if there are no more records for the day)
+    """
+    pos = 0
+    end = len(buf)
+    try:
+        while pos < end:
+            (d, _, n) = steprecord.decode(buf, pos, samples, doy)
+            if d > doy:
+                return 0
+            pos = n
+    except IndexError:
+        # The last record was cut short by the end of the buffer
+        pass
+    return pos
+
+def _reindex(log):
+    """Rebuild the index of a log from the records."""
+    index = array.array('I', bytes(4 * 366))
+    pos = _HEADER
+    end = log.end
+    while pos < end:
+        try:
+            (doy, _, n) = steprecord.decode(
+                    log.read(pos, steprecord.MAX_RECORD))
+        except IndexError:
+            break
+        if 1 <= doy <= 366 and not index[doy - 1]:
+            index[doy - 1] = pos
+        pos += n
+
+    old = array.array('I', log.read(_INDEX, 4 * 366))
+    for i in range(366):
+        if old[i] != index[i]:
+            log.patch(_INDEX + 4 * i, array.array('I', (index[i],)))
+
+def _open(fname, magic, header, repair, rebase):
+    """Open a journal.
+
+    :param repair: Move a file with the wrong magic number out of the way
+                   (to ``<fname>.bad``) and start again rather than raising
+                   ValueError
+    :param rebase: Function to resubmit buffered data if the file changes
+                   behind the journal's back
+    """
+    try:
+        return writeback.Journal(fname, magic, header, max_age=_MAX_AGE,
+                                 rebase=rebase)
+    except ValueError:
+        if not repair:
+            raise
+
+    bad = fname + '.bad'
+    try:
+        os.remove(bad)
+    except OSError:
+        pass
+    os.rename(fname, bad)
+    return writeback.Journal(fname, magic, header, max_age=_MAX_AGE,
+                             rebase=rebase)
+
+def _week(t):
+    """Find the week of the year for a time tuple.
+
+    Weeks start on Monday and week 0 is the (possibly partial) week that
+    contains the 1st of January.
+    """
+    # Work out what day of the week the 1st of January was
+    jan1 = (t[6] - t[7] + 1) % 7
+    return (t[7] - 1 + jan1) // 7
+
+def _slots(t):
+    """Find the entries in the totals file for a time tuple."""
+    return (DAILY + t[7] - 1, WEEKLY + _week(t), MONTHLY + t[1] - 1)
 
 class StepIterator:
+    """Iterate over the samples in an old style (one file per day) log.
+
+    The whole file is read, with a single call to readinto(), into a
+    buffer that is allocated once (directly, without building a
+    temporary to initialize it) and reused each time the iterator is
+    restarted. The latest samples (if any) follow the samples from the
+    file.
+    """
     def __init__(self, fname, data=None):
         self._fname = fname
-        self._f = None
         self._d = data
-
-    def __del__(self):
-        self.close()
+        self._buf = None
+        self._n = 0
+        self._c = DAY_LENGTH
 
     def __iter__(self):
-        self.close()
-        self._f = open(self._fname, 'rb')
+        buf = self._buf
+        if not buf:
+            buf = bytearray(2 * DAY_LENGTH)
+            self._buf = buf
+
+        with open(self._fname, 'rb') as f:
+            n = f.readinto(buf)
+        self._n = n // 2 if n else 0
         self._c = 0
         return self
 
     def __next__(self):
-        self._c += 1
-        if self._c > (24*60*60) // TICK_PERIOD:
+        c = self._c
+        if c >= DAY_LENGTH:
             raise StopIteration
+        self._c = c + 1
 
-        if self._f:
-            spl = self._f.read(2)
-            if spl:
-                return spl[0] + (spl[1] << 8)
-            self.close()
-            self._i = 0
+        if c < self._n:
+            buf = self._buf
+            return buf[2 * c] | (buf[2 * c + 1] << 8)
 
-        if self._d and self._i < len(self._d):
-            i = self._i
-            self._i += 1
+        i = c - self._n
+        if self._d and i < len(self._d):
             return self._d[i]
 
         return 0
 
     def close(self):
-        if self._f:
-            self._f.close()
-            self._f = None
+        pass
 
 class StepLogger:
     def __init__(self, manager):
         self._data = array.array('H', (0,) * DUMP_LENGTH)
         self._steps = wasp.watch.accel.steps
+        self._log = None
+        self._totals = None
 
         try:
             os.mkdir('logs')
@@ -75,18 +246,26 @@ class StepLogger:
         """Capture the current step count in N minute intervals.
 
         The samples are queued in a small RAM buffer in order to reduce
-        the number of flash access. The data is written out every few hours
+        the number of flash access. The data is encoded every few hours
         in a binary format ready to be reloaded and graphed when it is
-        needed.
+        needed and handed to the journal which decides when to write it
+        to the flash.
         """
         t = self._t
+        if self._log:
+            self._log.poll(t)
+        if self._totals:
+            self._totals.poll(t)
 
         # Work out where we are in the dump period
         i = t % DUMP_PERIOD // TICK_PERIOD
 
-        # Get the current step count and record it
+        # Get the current step count and record it. The counter is reset
+        # at midnight so, if it has gone backwards, it has started again
+        # from zero.
         steps = wasp.watch.accel.steps
-        self._data[i] = steps - self._steps
+        delta = steps - self._steps
+        self._data[i] = delta if delta >= 0 else steps
         self._steps = steps
 
         # Queue the next tick
@@ -106,35 +285,225 @@ class StepLogger:
         then = int(time.mktime((yyyy, mm, dd, 0, 0, 0, 0, 0, 0)))
         elapsed = t - then
 
-        # Work out how dumps we expect to find in today's dumpfile
+        # Work out which dump this is
         dump_num = elapsed // DUMP_PERIOD
 
-        # Update the log data
-        try:
-            os.mkdir('logs/' + str(yyyy))
-        except:
-            pass
-        fname = 'logs/{}/{:02d}-{:02d}.steps'.format(yyyy, mm, dd)
-        offset = dump_num * DUMP_LENGTH * 2
-        try:
-            sz = os.stat(fname)[6]
-        except:
-            sz = 0
-        f = open(fname, 'ab')
-        # This is a portable (between real Python and MicroPython) way to
-        # grow the file to the right size.
-        f.seek(min(sz, offset))
-        for _ in range(sz, offset, 2):
-            f.write(b'\x00\x00')
-        f.write(self._data)
-        f.close()
+        # Update the totals first (if the totals file has to be rebuilt
+        # then it must not include this dump twice)
+        self._add_total(walltime, sum(self._data), t)
+        self._append(yyyy, walltime[7],
+                     steprecord.encode(walltime[7], dump_num, self._data), t)
 
         # Wipe the data
         data = self._data
         for i in range(DUMP_LENGTH):
             data[i] = 0
 
+    def _journal(self, yyyy, repair=False):
+        """Get the journal for the log for a particular year.
+
+        :param repair: Repair the log (if needed) so it can be written to
+        """
+        fname = 'logs/{}.steps'.format(yyyy)
+        log = self._log
+        if log and log.fname == fname:
+            return log
+        log = _open(fname, _MAGIC, _HEADER - 8, repair, self._rebase)
+        if repair and log.damaged:
+            _reindex(log)
+        return log
+
+    def _rebase(self, log, data, patches):
+        """Append records (again) after the log changed behind our back.
+
+        The patches only update the index so they are recreated from the
+        records.
+        """
+        pos = 0
+        while pos < len(data):
+            (doy, _, n) = steprecord.decode(data, pos)
+            self._index(log, doy, log.append(data[pos:n]))
+            pos = n
+
+    def _writer(self, yyyy):
+        """Get the journal for the log for a particular year, ready to be
+        written to."""
+        log = self._journal(yyyy, True)
+        if log is not self._log:
+            if self._log:
+                self._log.close()
+            self._log = log
+        return log
+
+    def _append(self, yyyy, doy, rec, t):
+        """Append a record to the log (and update the index)."""
+        log = self._writer(yyyy)
+        self._index(log, doy, log.append(rec, t))
+        log.poll(t)
+
+    def _index(self, log, doy, offset):
+        """Record the offset of a day's first record in the index."""
+        index = _INDEX + 4 * (doy - 1)
+        if not writeback.word(log.read(index, 4)):
+            log.patch(index, array.array('I', (offset,)))
+
+    def _rollup(self, yyyy, repair=False):
+        """Get the journal for the totals file for a particular year.
+
+        :param repair: Repair the totals file (if needed) so it can be
+                       written to
+        :returns: The journal or None if there is no data for the year
+        """
+        fname = 'logs/{}.total'.format(yyyy)
+        log = self._totals
+        if log and log.fname == fname:
+            return log
+
+        rebase = self._rebase_totals
+        log = _open(fname, _TOTALS_MAGIC, 4 * _TOTALS, repair, rebase)
+        if repair and log.damaged:
+            # We can't tell which totals were torn so start again
+            os.remove(fname)
+            log = _open(fname, _TOTALS_MAGIC, 4 * _TOTALS, repair, rebase)
+
+        rebuild = False
+        try:
+            os.stat(fname)
+        except OSError:
+            # Rebuild from the step log and/or the old style logs
+            for src in ('logs/{}.steps', 'logs/{}'):
+                try:
+                    os.stat(src.format(yyyy))
+                    rebuild = True
+                except OSError:
+                    pass
+            if not rebuild and yyyy != time.localtime(self._t)[0]:
+                return None
+
+        if rebuild:
+            if repair:
+                # Make sure the index can be trusted
+                self._writer(yyyy)
+            for doy in range(1, 367):
+                t = time.mktime((yyyy, 1, doy, 0, 0, 0, 0, 0, 0))
+                t = time.localtime(t)
+                if t[0] != yyyy:
+                    break
+                samples = self._read(yyyy, doy)
+                if not samples:
+                    samples = self._legacy(t)
+                if samples:
+                    self._add_to(log, t, sum(samples))
+            log.close()
+        return log
+
+    def _rebase_totals(self, log, data, patches):
+        """Drop the totals after the file changed behind our back.
+
+        The totals we were about to write were calculated from the old
+        file so they are thrown away (along with the file) and the totals
+        are rebuilt from the step log when they are next needed.
+        """
+        try:
+            os.remove(log.fname)
+        except OSError:
+            pass
+        if log is self._totals:
+            self._totals = None
+
+    def _add_to(self, log, t, steps, now=None):
+        """Add steps to the totals for a time tuple."""
+        for i in _slots(t):
+            offset = 8 + 4 * i
+            total = writeback.word(log.read(offset, 4)) + steps
+            log.patch(offset, array.array('I', (total,)), now)
+
+    def _add_total(self, t, steps, now):
+        """Add a dump to the daily, weekly and monthly totals."""
+        log = self._rollup(t[0], True)
+        if log is not self._totals:
+            if self._totals:
+                self._totals.close()
+            self._totals = log
+        if steps:
+            self._add_to(log, t, steps, now)
+        log.poll(now)
+
+    def totals(self, yyyy, first=DAILY, count=1):
+        """Get a range of step count totals.
+
+        The totals for a year are stored together so any range is
+        fetched with a single read:
+
+        .. code-block:: python
+
+            steps = wasp.system.steps
+            month = steps.totals(2021, steplogger.MONTHLY + 5)[0]
+            weeks = steps.totals(2021, steplogger.WEEKLY, 54)
+
+        :param yyyy: The year
+        :param first: Index of the first total (e.g. ``DAILY + doy - 1``,
+                      ``WEEKLY + week`` or ``MONTHLY + mm - 1``)
+        :param count: Number of totals to fetch
+        :returns: An array of totals (including the steps that have not
+                  yet been written to the log)
+        """
+        try:
+            log = self._rollup(yyyy)
+        except ValueError:
+            log = None
+        if log:
+            totals = array.array('I', log.read(8 + 4 * first, 4 * count))
+        else:
+            totals = array.array('I', bytes(4 * count))
+
+        # Add in the latest samples (the ones we haven't recorded yet)
+        now = time.localtime(self._t)
+        if now[0] == yyyy:
+            i = self._t % DUMP_PERIOD // TICK_PERIOD
+            steps = wasp.watch.accel.steps
+            latest = steps - self._steps
+            if latest < 0:
+                latest = steps
+            for j in range(i):
+                latest += self._data[j]
+            for j in _slots(now):
+                if first <= j < first + count:
+                    totals[j - first] += latest
+
+        return totals
+
+    def _read(self, yyyy, doy):
+        """Read the samples for a day from the log.
+
+        :returns: An array of DAY_LENGTH samples or None if there is no
+                  data for the day
+        """
+        try:
+            log = self._journal(yyyy)
+        except ValueError:
+            return None
+
+        offset = writeback.word(log.read(_INDEX + 4 * (doy - 1), 4))
+        if not offset or offset >= log.end:
+            return None
+        samples = array.array('H', bytes(2 * DAY_LENGTH))
+        while True:
+            buf = log.read(offset, _MAX_DAY)
+            n = _decode(buf, doy, samples)
+            if not n or len(buf) < _MAX_DAY:
+                break
+            offset += n
+        return samples
+
     def data(self, t):
+        """Get the step counts for a day.
+
+        :param t: The day (either a time or a time tuple)
+        :returns: Iterable containing the step count for each six minute
+                  interval of the day or None if there is no data for
+                  that day
+        """
         try:
             yyyy = t[0]
         except:
@@ -142,14 +511,11 @@ class StepLogger:
             yyyy = t[0]
         mm = t[1]
         dd = t[2]
+        if len(t) < 8:
+            t = time.localtime(time.mktime((yyyy, mm, dd, 0, 0, 0, 0, 0, 0)))
 
-        fname = 'logs/{}/{:02d}-{:02d}.steps'.format(yyyy, mm, dd)
-        try:
-            os.stat(fname)
-        except:
-            return None
-
-        # Record the data in the flash
+        # Merge in the latest samples (the ones we haven't written yet)
+        # if we are looking at today
         now = time.localtime(self._t)
         if now[:3] == t[:3]:
             latest = self._data
@@ -157,8 +523,35 @@ class StepLogger:
             # Work out where we are in the dump period and update
             # with the latest counts
             i = self._t % DUMP_PERIOD // TICK_PERIOD
-            latest[i] = wasp.watch.accel.steps - self._steps
+            steps = wasp.watch.accel.steps
+            delta = steps - self._steps
+            latest[i] = delta if delta >= 0 else steps
         else:
             latest = None
 
+        samples = self._read(yyyy, t[7])
+        if samples:
+            if latest:
+                # Find the start of the current dump
+                then = int(time.mktime((yyyy, mm, dd, 0, 0, 0, 0, 0, 0)))
+                base = (self._t - then) // DUMP_PERIOD * DUMP_LENGTH
+                for i in range(DUMP_LENGTH):
+                    samples[base + i] = latest[i]
+            return samples
+
+        return self._legacy(t, latest)
+
+    def _legacy(self, t, latest=None):
+        """Read the samples for a day from an old style (one file per
+        day) log.
+
+        :returns: A :py:class:`StepIterator` or None if there is no log
+                  for the day
+        """
+        fname = 'logs/{}/{:02d}-{:02d}.steps'.format(t[0], t[1], t[2])
+        try:
+            os.stat(fname)
+        except:
+            return None
+
         return StepIterator(fname, latest)
@@ -0,0 +1,98 @@
+# SPDX-License-Identifier: LGPL-3.0-or-later
+# Copyright (C) 2026 agent
+
+"""Step log records
+~~~~~~~~~~~~~~~~~~~~
+
+Encode and decode the records kept in the step log (the format is
+described in :py:mod:`steplogger`).
+
+This module only uses the core language so it is shared by the watch and
+the host tools (tools/steplog.py), which keeps the two from drifting
+apart.
+"""
+
+#: Number of samples in a dump (and in a record)
+DUMP_LENGTH = 30
+#: Number of samples in a day
+DAY_LENGTH = 240
+#: Worst case size of a record (two varints to identify the dump and up
+#: to three bytes per sample)
+MAX_RECORD = 3 + 3 * DUMP_LENGTH
+
+def encode(doy, dump, data):
+    """Encode a dump as a record.
+
+    :param int doy: Day of the year
+    :param int dump: Dump number within the day
+    :param data: The DUMP_LENGTH samples
+    :returns: The record as a bytearray
+    """
+    rec = bytearray()
+
+    def varint(v):
+        while v > 0x7f:
+            rec.append((v & 0x7f) | 0x80)
+            v >>= 7
+        rec.append(v)
+
+    varint(doy)
+    varint(dump)
+    zeros = 0
+    for v in data:
+        if v == 0:
+            zeros += 1
+            continue
+        if zeros:
+            varint((zeros << 1) | 1)
+            zeros = 0
+        varint(v << 1)
+    if zeros:
+        varint((zeros << 1) | 1)
+
+    return rec
+
+def decode(buf, pos=0, samples=None, doy=0):
+    """Decode a record.
+
+    :param buf: Buffer holding the record
+    :param int pos: Offset of the record within buf
+    :param samples: Array of DAY_LENGTH samples to store the dump in
+                    (None to skip over the record)
+    :param int doy: Only store the samples if the record is for this day
+                    of the year (0 to store them whatever the day)
+    :returns: (doy, dump, pos) tuple, where pos is the offset of the
+              next record
+    :raises IndexError: If the record is cut short by the end of buf
+    """
+    def varint():
+        nonlocal pos
+        v = 0
+        shift = 0
+        while True:
+            b = buf[pos]
+            pos += 1
+            v |= (b & 0x7f) << shift
+            if b < 0x80:
+                return v
+            shift += 7
+
+    d = varint()
+    dump = varint()
+    if doy and d != doy:
+        samples = None
+    i = dump * DUMP_LENGTH
+    n = i + DUMP_LENGTH
+    while i < n:
+        v = varint()
+        if v & 1:
+            if samples is not None:
+                for j in range(i, min(n, i + (v >> 1), len(samples))):
+                    samples[j] = 0
+            i += v >> 1
+        else:
+            if samples is not None and i < len(samples):
+                samples[i] = v >> 1
+            i += 1
+
+    return (d, dump, pos)
@@ -14,13 +14,16 @@
     wasp.watch is an import of :py:mod:`watch` and is simply provided as a
     shortcut (and to reduce memory by keeping it out of other namespaces).
 """
+import array
 import gc
 import machine
 import micropython
 import steplogger
 import sys
+import time
 import watch
 import widgets
+import writeback
 import appregistry
 
 from apps.system.launcher import LauncherApp
@@ -82,6 +85,18 @@ class PinHandler():
         self._value = new_value
         return new_value
 
+# Maximum number of touch events handled in a single tick
+_MAX_EVENTS = 8
+
+# Identical swipes closer together than this are merged
+_COALESCE_MS = 100
+
+# The watch wakes up from deep sleep at least this often
+_WAKE_MS = 125
+
+# Cleared if machine.lightsleep() can't be given a time to wake up
+_timed_sleep = True
+
 def _key_app(d):
     """Get a sort key for apps."""
     return d.NAME
@@ -90,6 +105,244 @@ def _key_alarm(d):
     """Get a sort key for alarms."""
     return d[0]
 
+def _heappush(heap, item):
+    """Add an item to a binary heap.
+
+    The heap functions are equivalent to those in the heapq module (which
+    is not always available on the watch).
+    """
+    heap.append(item)
+    i = len(heap) - 1
+    while i:
+        parent = (i - 1) >> 1
+        if not item < heap[parent]:
+            break
+        heap[i] = heap[parent]
+        i = parent
+    heap[i] = item
+
+def _heappop(heap):
+    """Remove (and return) the smallest item from a binary heap."""
+    last = heap.pop()
+    if not heap:
+        return last
+    top = heap[0]
+    _siftdown(heap, 0, last)
+    return top
+
+def _siftdown(heap, i, item):
+    n = len(heap)
+    while True:
+        child = 2 * i + 1
+        if child >= n:
+            break
+        if child + 1 < n and heap[child + 1] < heap[child]:
+            child += 1
+        if not heap[child] < item:
+            break
+        heap[i] = heap[child]
+        i = child
+    heap[i] = item
+
+def _heapify(heap):
+    """Turn a list into a binary heap (in place)."""
+    for i in range(len(heap) // 2 - 1, -1, -1):
+        _siftdown(heap, i, heap[i])
+
+class TickTracer():
+    """Record how long each phase of the system tick takes.
+
+    The tracer keeps the timings for the most recent ticks in a fixed-size
+    ring buffer so it can be left running without using up the heap. Ticks
+    that take less than the threshold are not recorded, allowing the
+    buffer to be reserved for the expensive ones.
+
+    Tracing is enabled (and the tracer found) using
+    :py:meth:`.Manager.trace`. The results can be examined from the REPL:
+
+    .. code-block:: python
+
+        wasp.system.trace()
+        # ... use the watch for a while ...
+        wasp.system.tracer.dump()
+
+    ``wasptool --trace`` does the same thing from the workstation.
+    """
+    PHASES = ('rtc', 'alarm', 'tick', 'button', 'touch', 'gc')
+
+    def __init__(self, size=16, threshold=0):
+        """
+        :param int size: Number of ticks to keep
+        :param int threshold: Do not record ticks that take less than this
+                              many microseconds
+        """
+        n = len(self.PHASES)
+        self.size = size
+        self.threshold = threshold
+        self._timings = array.array('I', [0] * (n * size))
+        self._stamps = [0] * size
+        self._apps = [None] * size
+        self._current = array.array('I', [0] * n)
+        self._next = 0
+        self._then = 0
+        self.count = 0
+        self.worst = (0, None)
+
+    def start(self):
+        """Start timing a tick."""
+        current = self._current
+        for i in range(len(current)):
+            current[i] = 0
+        self._then = time.ticks_us()
+
+    def mark(self, phase):
+        """Charge the time since the last mark to a phase.
+
+        :param int phase: Index of the phase in PHASES
+        """
+        now = time.ticks_us()
+        self._current[phase] += time.ticks_diff(now, self._then)
+        self._then = now
+
+    def finish(self, app):
+        """Finish timing a tick and record it if it was slow enough.
+
+        :param app: The application that was running during the tick
+        """
+        current = self._current
+        total = sum(current)
+        if total < self.threshold:
+            return
+        name = getattr(app, 'NAME', None)
+        if total > self.worst[0]:
+            self.worst = (total, name)
+
+        n = len(current)
+        slot = self._next
+        timings = self._timings
+        for i in range(n):
+            timings[slot*n + i] = current[i]
+        self._stamps[slot] = watch.rtc.get_uptime_ms()
+        self._apps[slot] = name
+        self._next = (slot + 1) % self.size
+        self.count += 1
+
+    def entries(self):
+        """Get the recorded ticks, oldest first.
+
+        :returns: List of (uptime_ms, app name, timings) tuples where the
+                  timings are in microseconds and in the same order as
+                  PHASES
+        """
+        n = len(self.PHASES)
+        entries = []
+        for i in range(min(self.count, self.size)):
+            slot = (self._next - min(self.count, self.size) + i) % self.size
+            entries.append((self._stamps[slot], self._apps[slot],
+                            tuple(self._timings[slot*n:(slot+1)*n])))
+        return entries
+
+    def dump(self):
+        """Print the recorded ticks as a table (in microseconds)."""
+        print('uptime_ms,app,' + ','.join(self.PHASES) + ',total')
+        for (ms, name, timings) in self.entries():
+            print('{},{},{},{}'.format(ms, name,
+                    ','.join([str(t) for t in timings]), sum(timings)))
+        print('# {} ticks recorded, worst was {}us in {}'.format(
+                self.count, self.worst[0], self.worst[1]))
+
+class GcPolicy():
+    """Garbage collection policy that collects on every tick.
+
+    This is the simplest possible policy (and the one that wasp-os has
+    traditionally used). It is also the base class for other policies,
+    which override :py:meth:`.wanted`, and it keeps the statistics: the
+    number of collections, and the total and worst case time they took (in
+    microseconds).
+
+    The policy is selected by assigning to ``wasp.system.gc_policy``:
+
+    .. code-block:: python
+
+        wasp.system.gc_policy = wasp.GcPolicy()
+        # ... use the watch for a while ...
+        print(wasp.system.gc_policy.collections)
+    """
+    def __init__(self):
+        self.collections = 0
+        self.total_us = 0
+        self.max_us = 0
+
+    def wanted(self, busy):
+        """Decide whether to collect on this tick.
+
+        :param bool busy: True if the tick handled an event or ticked the
+                          application
+        """
+        return True
+
+    def poll(self, busy):
+        """Run the garbage collector if the policy wants to.
+
+        Called by the system manager on every tick when the watch is awake.
+        """
+        if self.wanted(busy):
+            self.collect()
+
+    def collect(self):
+        """Run the garbage collector (and record how long it took)."""
+        then = time.ticks_us()
+        gc.collect()
+        elapsed = time.ticks_diff(time.ticks_us(), then)
+        self.collections += 1
+        self.total_us += elapsed
+        if elapsed > self.max_us:
+            self.max_us = elapsed
+
+class AdaptiveGcPolicy(GcPolicy):
+    """Garbage collection policy that collects only when it is useful.
+
+    Collections happen:
+
+    * when free memory drops below the low water mark,
+    * during a quiet tick once idle_ms have passed since the last
+      collection,
+    * and, regardless of how busy the system is, once max_ms have passed.
+
+    In addition the runtime is asked (using ``gc.threshold()``) to collect
+    by itself whenever threshold bytes have been allocated, meaning apps
+    that allocate heavily while busy do not run out of memory.
+    """
+    def __init__(self, threshold=4096, low_water=8192, idle_ms=500,
+                 max_ms=5000):
+        """
+        :param int threshold: Bytes allocated before the runtime collects
+                              automatically (or -1 to disable)
+        :param int low_water: Collect whenever free memory is lower than
+                              this many bytes
+        :param int idle_ms: Collect during quiet ticks if this long has
+                            passed since the last collection
+        :param int max_ms: Always collect if this long has passed since the
+                           last collection
+        """
+        super().__init__()
+        self.low_water = low_water
+        self.idle_ms = idle_ms
+        self.max_ms = max_ms
+        self._last = watch.rtc.get_uptime_ms()
+        if 'threshold' in dir(gc):
+            gc.threshold(threshold)
+
+    def wanted(self, busy):
+        since = watch.rtc.get_uptime_ms() - self._last
+        if since >= self.max_ms or (not busy and since >= self.idle_ms):
+            return True
+        return 'mem_free' in dir(gc) and gc.mem_free() < self.low_water
+
+    def collect(self):
+        super().collect()
+        self._last = watch.rtc.get_uptime_ms()
+
 class Manager():
     """Wasp-os system manager
 
@@ -133,6 +386,12 @@ class Manager():
         self.blank_after = 15
 
         self._alarms = []
+        self._alarm_seq = 0
+        self._alarm_dead = 0
+        self._alarm_later = []
+        self._timers = []
+        self.tracer = None
+        self.gc_policy = AdaptiveGcPolicy()
         self._brightness = 2
         self._notifylevel = 2
         if 'P8' in watch.os.uname().machine:
@@ -141,6 +400,11 @@ class Manager():
             self._nfylevels = [0, 40, 80]
         self._nfylev_ms = self._nfylevels[self._notifylevel - 1]
         self._button = PinHandler(watch.button)
+        self._swipe = 0
+        self._swipe_ms = 0
+        # Milliseconds from the last touch event arriving until the app
+        # had finished handling it
+        self.input_latency = 0
         self._charging = True
         self._scheduled = False
         self._scheduling = False
@@ -265,9 +529,12 @@ class Manager():
         self.event_mask = 0
         self.tick_period_ms = 0
         self.tick_expiry = None
+        self._timers = [t for t in self._timers if t[3]]
 
         self.app = app
         watch.display.mute(True)
+        if watch.display.scroll_offset:
+            watch.display.scroll(0)
         watch.drawable.reset()
         app.foreground()
         watch.display.mute(False)
@@ -344,22 +611,96 @@ class Manager():
 
         :param int time: Time to trigger the alarm (use time.mktime)
         :param function action: Action to perform when the alarm expires.
+        :returns: Handle that can be passed to :py:meth:`.cancel_alarm`
+        """
+        # Alarms are kept in a binary heap. The sequence number ensures
+        # alarms due at the same time fire in the order they were set (and
+        # that the actions themselves are never compared).
+        self._alarm_seq += 1
+        alarm = [time, self._alarm_seq, action]
+        _heappush(self._alarms, alarm)
+        return alarm
+
+    def cancel_alarm(self, time, action=None):
+        """Unqueue an alarm.
+
+        An alarm can be cancelled either using the handle returned by
+        :py:meth:`.set_alarm` (``cancel_alarm(handle)``) or by giving the
+        time and the action (which cancels one matching alarm). If the
+        time is None then every alarm with a matching action is
+        cancelled.
+
+        :returns: True if any alarm was cancelled, False otherwise
         """
-        self._alarms.append((time, action))
-        self._alarms.sort(key=_key_alarm)
+        if action is None:
+            # Anything other than a handle does not match any alarm
+            found = type(time) is list and len(time) == 3 and \
+                    self._kill_alarm(time)
+        else:
+            found = False
+            for alarms in (self._alarms, self._alarm_later):
+                for alarm in alarms:
+                    if alarm[2] == action and (not time or alarm[0] == time):
+                        found |= self._kill_alarm(alarm)
+                        if time:
+                            break
+                if found and time:
+                    break
+
+        # Cancelled alarms are left in the heap (and skipped when they
+        # reach the top) so rebuild the heap if they start to dominate it
+        if self._alarm_dead > 16 and self._alarm_dead * 2 > len(self._alarms):
+            alarms = self._alarms
+            alarms[:] = [a for a in alarms if a[2]]
+            _heapify(alarms)
+            later = self._alarm_later
+            later[:] = [a for a in later if a[2]]
+            self._alarm_dead = 0
+
+        return found
+
+    def _kill_alarm(self, alarm):
+        if not alarm[2]:
+            return False
+        alarm[2] = None
+        self._alarm_dead += 1
+        return True
 
-    def cancel_alarm(self, time, action):
-        """Unqueue an alarm."""
+    def next_alarm(self):
+        """Get the time the next alarm is due (or None if there are none)."""
+        alarms = self._alarms
+        while alarms and not alarms[0][2]:
+            _heappop(alarms)
+            self._alarm_dead -= 1
+        return alarms[0][0] if alarms else None
+
+    def _run_alarms(self, now):
+        """Perform the actions of every alarm that is due.
+
+        Alarms that are set by the actions are left for the next tick,
+        even if they are already due, so a misbehaving action cannot
+        keep us here forever. Until then they wait in ``_alarm_later``
+        (where :py:meth:`.cancel_alarm` can still find them) and they are
+        put back even if an action raises an exception.
+        """
         alarms = self._alarms
+        last = self._alarm_seq
+        later = self._alarm_later
         try:
-            if not time:
-                time_to_remove = [al[0] for al in alarms if al[1] == action]
-                [alarms.remove((t, action)) for t in time_to_remove]
-            else:
-                alarms.remove((time, action))
-        except:
-            return False
-        return True
+            while alarms and alarms[0][0] <= now:
+                alarm = _heappop(alarms)
+                action = alarm[2]
+                if not action:
+                    self._alarm_dead -= 1
+                elif alarm[1] > last:
+                    later.append(alarm)
+                else:
+                    alarm[2] = None
+                    action()
+        finally:
+            for alarm in later:
+                _heappush(alarms, alarm)
+            later.clear()
 
     def request_event(self, event_mask):
         """Subscribe to events.
@@ -371,8 +712,9 @@ class Manager():
     def request_tick(self, period_ms=None):
         """Request (and subscribe to) a periodic tick event.
 
-        Note: With the current simplistic timer implementation sub-second
-        tick intervals are not possible.
+        Note: Sub-second tick intervals are possible but the watch only
+        wakes from deep sleep every 125ms so, on real hardware, shorter
+        ticks will be delivered late. See also :py:meth:`.set_timer`.
         """
         if period_ms:
             self.tick_period_ms = period_ms
@@ -381,6 +723,122 @@ class Manager():
             self.tick_period_ms = 0
             self.tick_expiry = None
 
+    def set_timer(self, ms, callback, periodic=False, system=False):
+        """Start a timer.
+
+        Unlike the tick (see :py:meth:`.request_tick`) an application can
+        have any number of timers. Timers belong to the foreground
+        application and are cancelled when it is switched out unless they
+        are system timers.
+
+        :param int ms: Milliseconds until the timer expires
+        :param function callback: Function to call (without arguments) when
+                                  the timer expires
+        :param bool periodic: Restart the timer every time it expires.
+                              Expiries that are missed (because the system
+                              was busy) are skipped rather than queued up.
+        :param bool system: The timer belongs to a system service rather
+                            than the foreground application
+        :returns: Handle that can be passed to :py:meth:`.cancel_timer`
+
+        Note: The timers are only guaranteed to be as accurate as the
+        system tick. :py:meth:`.run` wakes up early for a timer if the
+        port's ``machine.lightsleep()`` accepts a time to sleep for but
+        the nRF52 watches (and :py:meth:`.schedule`) only check the
+        timers each time the watch wakes up (every 125ms).
+        """
+        timer = [watch.rtc.get_uptime_ms() + ms,
+                 ms if periodic else 0, callback, system]
+        self._timers.append(timer)
+        self._timers.sort(key=_key_alarm)
+        return timer
+
+    def cancel_timer(self, timer):
+        """Stop a timer.
+
+        :param timer: Handle returned by :py:meth:`.set_timer`
+        :returns: True if the timer was stopped, False if it was not running
+        """
+        timers = self._timers
+        for i in range(len(timers)):
+            if timers[i] is timer:
+                del timers[i]
+                return True
+        return False
+
+    def next_deadline(self):
+        """Find out how long the system can sleep for.
+
+        :returns: Milliseconds until the next timer (or the application
+                  tick) is due, or None if nothing is waiting
+        """
+        deadline = None
+        if self._timers:
+            deadline = self._timers[0][0]
+        if self.sleep_at and self.tick_expiry:
+            if deadline is None or self.tick_expiry < deadline:
+                deadline = self.tick_expiry
+        if deadline is None:
+            return None
+        return max(0, deadline - watch.rtc.get_uptime_ms())
+
+    def _sleep(self):
+        """Sleep until the next interrupt (or the next timer deadline)."""
+        global _timed_sleep
+        ms = self.next_deadline()
+        if ms is not None and ms < _WAKE_MS and _timed_sleep:
+            try:
+                machine.lightsleep(ms)
+                return
+            except TypeError:
+                # This port can't set a time to wake up
+                _timed_sleep = False
+        machine.deepsleep()
+
+    def _run_timers(self):
+        """Call the callbacks of any timers that have expired.
+
+        Timers started by the callbacks are left for the next pass, even
+        if they are already due, and timers stopped by the callbacks
+        (including by :py:meth:`.switch`) do not fire.
+        """
+        now = watch.rtc.get_uptime_ms()
+        due = []
+        for timer in self._timers:
+            if timer[0] > now:
+                break
+            due.append(timer)
+
+        for timer in due:
+            if not self.cancel_timer(timer):
+                continue
+            if timer[1]:
+                while timer[0] <= now:
+                    timer[0] += timer[1]
+                self._timers.append(timer)
+                self._timers.sort(key=_key_alarm)
+            timer[2]()
+
+    def trace(self, size=16, threshold=0):
+        """Enable (or disable) tracing of the system tick.
+
+        Calling this when tracing is already enabled with the same size
+        leaves the existing tracer (and its results) in place.
+
+        :param int size: Number of ticks to keep, or 0 to disable tracing
+        :param int threshold: Do not record ticks that take less than this
+                              many microseconds
+        :returns: The :py:class:`.TickTracer` (or None if tracing is
+                  disabled)
+        """
+        if not size:
+            self.tracer = None
+        elif not self.tracer or self.tracer.size != size:
+            self.tracer = TickTracer(size, threshold)
+        else:
+            self.tracer.threshold = threshold
+        return self.tracer
+
     def keep_awake(self):
         """Reset the keep awake timer."""
         self.sleep_at = watch.rtc.uptime + self.blank_after
@@ -397,6 +855,11 @@ class Manager():
         self._charging = watch.battery.charging()
         self.sleep_at = None
 
+        # Write out anything the logs are holding in RAM. They can be
+        # batched up for hours so this keeps the data that would be lost
+        # by a crash (or a reset) whilst the watch is in use small.
+        writeback.sync()
+
     def wake(self):
         """Return to a running state.
         """
@@ -454,6 +917,39 @@ class Manager():
 
         watch.touch.reset_touch_data()
 
+    def _drain_touch(self):
+        """Handle the queued touch events.
+
+        A swipe that repeats the previous swipe within _COALESCE_MS is
+        taken to be the touch controller reporting the same gesture again
+        and is dropped.
+
+        :returns: True if any events were handled
+        """
+        touch = watch.touch
+        handled = False
+        for i in range(_MAX_EVENTS):
+            if not self.sleep_at:
+                break
+            event = touch.get_event()
+            if not event:
+                break
+
+            ms = touch.event_ms
+            kind = event[0]
+            if kind < 5 and kind == self._swipe and \
+                    time.ticks_diff(ms, self._swipe_ms) < _COALESCE_MS:
+                touch.reset_touch_data()
+            else:
+                self._handle_touch(event)
+                self.input_latency = time.ticks_diff(time.ticks_ms(), ms)
+                handled = True
+            if kind < 5:
+                self._swipe = kind
+                self._swipe_ms = ms
+
+        return handled
+
     @micropython.native
     def _tick(self):
         """Handle the system tick.
@@ -462,19 +958,24 @@ class Manager():
         circuit logic to quickly exit if we haven't reached a tick
         expiry point.
         """
+        tracer = self.tracer
+        if tracer:
+            tracer.start()
+
         rtc = watch.rtc
         update = rtc.update()
+        if tracer:
+            tracer.mark(0)
 
-        alarms = self._alarms
-        if update and alarms:
-            now = rtc.time()
-            head = alarms[0]
-
-            if head[0] <= now:
-                alarms.remove(head)
-                head[1]()
+        if update and self._alarms:
+            self._run_alarms(rtc.time())
+        if self._timers:
+            self._run_timers()
+        if tracer:
+            tracer.mark(1)
 
         if self.sleep_at:
+            busy = False
             if update and self.tick_expiry:
                 now = rtc.get_uptime_ms()
 
@@ -484,23 +985,37 @@ class Manager():
                         self.tick_expiry += self.tick_period_ms
                         ticks += 1
                     self.app.tick(ticks)
+                    busy = True
+            if tracer:
+                tracer.mark(2)
 
             state = self._button.get_event()
             if None != state:
                 self._handle_button(state)
+                busy = True
+            if tracer:
+                tracer.mark(3)
 
-            event = watch.touch.get_event()
-            if event:
-                self._handle_touch(event)
+            if self._drain_touch():
+                busy = True
 
             if self.sleep_at and watch.rtc.uptime > self.sleep_at:
                 self.sleep()
+            if tracer:
+                tracer.mark(4)
 
-            gc.collect()
+            self.gc_policy.poll(busy)
+            if tracer:
+                tracer.mark(5)
         else:
             if 1 == self._button.get_event() or \
                     self._charging != watch.battery.charging():
                 self.wake()
+            if tracer:
+                tracer.mark(3)
+
+        if tracer:
+            tracer.finish(self.app)
 
     def run(self, no_except=True):
         """Run the system manager synchronously.
@@ -526,7 +1041,7 @@ class Manager():
             # below
             while True:
                 self._tick()
-                machine.deepsleep()
+                self._sleep()
 
         while True:
             try:
@@ -541,11 +1056,10 @@ class Manager():
                     watch.print_exception(e)
                 self.switch(CrashApp(e))
 
-            # Currently there is no code to control how fast the system
-            # ticks. In other words this code will break if we improve the
-            # power management... we are currently relying on not being able
-            # to stay in the low-power state for very long.
-            machine.deepsleep()
+            # Sleep until the next timer is due (if the port can wake us
+            # up for it). Otherwise we are relying on not being able to
+            # stay in the low-power state for very long.
+            self._sleep()
 
     def _work(self):
         self._scheduled = False
@@ -0,0 +1,285 @@
+# SPDX-License-Identifier: LGPL-3.0-or-later
+# Copyright (C) 2026 agent
+
+"""Write-back journal
+~~~~~~~~~~~~~~~~~~~~~
+
+The flash filesystem rewrites (and, eventually, erases) at least a page
+whenever a file changes so writing a few bytes at a time costs far more
+flash wear than the data itself. A journal accumulates appended records
+in RAM and writes them to the flash in page-aligned chunks when enough
+data has built up or when the oldest data has waited long enough.
+
+Journaled files share a common layout:
+
+.. code-block::
+
+    0     magic (4 bytes, chosen by the owner of the file)
+    4     u32 end: length of the valid data (the commit marker)
+    8     fixed size header (contents chosen by the owner of the file)
+    ...   data
+
+Each flush writes the data first, then any changes to the header and
+finally the new value of ``end``. Data beyond ``end`` (for example
+because the watch was reset in the middle of a flush) is ignored and
+overwritten by the next flush. A file that is too short to hold the
+magic number and ``end`` (a new file whose first flush was interrupted)
+is treated as if it did not exist.
+
+The changes to the header are written in place so ``end`` cannot protect
+them. Instead, before the header is changed, ``end`` is rewritten with
+its top bit set and the bit is cleared again by the commit. If the bit
+is found to be set when the file is opened then a flush was interrupted
+part way through changing the header. The journal reports this as
+``damaged`` and it is up to the owner of the file to repair the header.
+
+The file may also be changed behind the journal's back (for example by
+a tool that adds old data to it) so each flush starts by checking that
+``end`` has not moved. If it has then the journal reloads ``end`` and
+hands the data it was holding back to its owner to be resubmitted.
+
+Every journal that is holding data in RAM is registered so that
+:py:func:`.sync` can be used to flush everything (e.g. before a reset).
+Journals that are only used to read a file are never registered so they
+can be freed as soon as their owner is done with them.
+The number of writes made to the flash is counted both by each journal
+and, in ``writes``, by this module.
+"""
+
+import array
+
+PAGE = 256
+
+# Total number of writes made by all journals
+writes = 0
+
+_journals = []
+
+def sync():
+    """Flush all the journals."""
+    for journal in _journals[:]:
+        journal.flush()
+
+def word(b):
+    """Decode a (little endian) u32."""
+    return b[0] | (b[1] << 8) | (b[2] << 16) | (b[3] << 24)
+
+class Journal:
+    """Write-back buffer for a journaled, append-only file.
+
+    .. automethod:: __init__
+    """
+    def __init__(self, fname, magic, header=0, max_bytes=PAGE, max_age=60*60,
+                 rebase=None):
+        """Open (or prepare to create) a journaled file.
+
+        :param str fname: Filename
+        :param bytes magic: Four byte magic number
+        :param int header: Size of the header (following the commit marker)
+        :param int max_bytes: Flush once this many bytes are waiting
+        :param int max_age: Flush once data has been waiting for this many
+                            seconds
+        :param rebase: Called, as ``rebase(journal, data, patches)``, if
+                       the file was changed behind our back before the
+                       data could be written. The journal is empty when
+                       it is called and it should append (and patch)
+                       whatever is still needed. By default the data is
+                       appended to the new end of the file and the
+                       patches are applied unchanged.
+        :raises ValueError: If the file does not have the right magic
+                            number
+        """
+        self.fname = fname
+        self.magic = magic
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.rebase = rebase
+        self.writes = 0
+        self.commits = 0
+        self._header = 8 + header
+        self._buf = bytearray()
+        self._patches = {}
+        self._since = None
+        self.damaged = False
+
+        end = self._load()
+        self._exists = end is not None
+        self._end = self._header if end is None else end
+
+    def _load(self):
+        """Read the commit marker.
+
+        :returns: The end of the committed data or None if the file has
+                  not been created yet
+        :raises ValueError: If the file does not have the right magic
+                            number
+        """
+        try:
+            with open(self.fname, 'rb') as f:
+                head = f.read(8)
+        except OSError:
+            return None
+        if len(head) < 8:
+            return None
+        if head[:4] != self.magic:
+            raise ValueError('{}: bad magic'.format(self.fname))
+        self.damaged = bool(head[7] & 0x80)
+        return max(word(head[4:]) & 0x7fffffff, self._header)
+
+    def close(self):
+        """Flush the journal (after which it is no longer tracked)."""
+        self.flush()
+
+    @property
+    def end(self):
+        """Offset of the end of the data (including data not yet written)."""
+        return self._end + len(self._buf)
+
+    def append(self, data, now=None):
+        """Append data to the file.
+
+        :param data: The data to append
+        :param now: Current time, in seconds, used for the age based flush
+                    policy
+        :returns: Offset in the file that the data will be written to
+        """
+        offset = self.end
+        if not self._buf and not self._patches:
+            self._since = now
+        if self not in _journals:
+            _journals.append(self)
+        self._buf.extend(data)
+        return offset
+
+    def patch(self, offset, data, now=None):
+        """Change part of the header.
+
+        The change is written out, along with the data, on the next flush.
+
+        :param offset: Offset in the file to change
+        :param data: The new contents
+        :param now: Current time, in seconds, used for the age based flush
+                    policy
+        """
+        if not self._buf and not self._patches:
+            self._since = now
+        if self not in _journals:
+            _journals.append(self)
+        self._patches[offset] = bytes(data)
+
+    def read(self, offset, size):
+        """Read from the file (including data not yet written).
+
+        :returns: Up to size bytes (fewer if we reach the end of the data)
+        """
+        end = min(offset + size, self.end)
+        if end <= offset:
+            return b''
+        out = bytearray(end - offset)
+
+        committed = min(end, self._end)
+        if offset < committed and self._exists:
+            try:
+                with open(self.fname, 'rb') as f:
+                    f.seek(offset)
+                    f.readinto(memoryview(out)[0:committed-offset])
+            except OSError:
+                # The file has been removed behind our back (the next
+                # flush will notice)
+                pass
+        if end > self._end:
+            start = max(offset, self._end)
+            out[start-offset:] = self._buf[start-self._end:end-self._end]
+
+        for (o, data) in self._patches.items():
+            for i in range(len(data)):
+                if offset <= o + i < end:
+                    out[o + i - offset] = data[i]
+
+        return out
+
+    def poll(self, now):
+        """Flush the journal if the flush policy requires it.
+
+        :param now: Current time, in seconds
+        """
+        if len(self._buf) >= self.max_bytes or \
+                (self._since is not None and now - self._since >= self.max_age):
+            self.flush()
+
+    def _reload(self, end):
+        """Catch up with a file that has been changed behind our back."""
+        buf = self._buf
+        patches = self._patches
+        self._clean()
+        self._exists = end is not None
+        self._end = self._header if end is None else end
+
+        if self.rebase:
+            self.rebase(self, buf, patches)
+        else:
+            self.append(buf)
+            for (offset, data) in patches.items():
+                self.patch(offset, data)
+
+    def _write(self, f, offset, data):
+        global writes
+        f.seek(offset)
+        f.write(data)
+        self.writes += 1
+        writes += 1
+
+    def flush(self):
+        """Write any buffered data to the flash (and commit it)."""
+        if not self._buf and not self._patches:
+            return
+
+        # Make sure the file hasn't changed since we last looked
+        end = self._load()
+        if end != (self._end if self._exists else None):
+            self._reload(end)
+            if not self._buf and not self._patches:
+                return
+        buf = self._buf
+
+        with open(self.fname, 'r+b' if self._exists else 'w+b') as f:
+            if not self._exists:
+                head = bytearray(self._header)
+                head[0:4] = self.magic
+                head[4:8] = array.array('I', (self._end,))
+                self._write(f, 0, head)
+                self._exists = True
+
+            # Mark the header as being changed
+            if self._patches:
+                marker = bytearray(array.array('I', (self._end,)))
+                marker[3] |= 0x80
+                self._write(f, 4, marker)
+
+            # Write the data in page aligned chunks
+            pos = self._end
+            data = memoryview(buf)
+            i = 0
+            while i < len(buf):
+                n = min(len(buf) - i, PAGE - pos % PAGE)
+                self._write(f, pos, data[i:i+n])
+                pos += n
+                i += n
+
+            for (offset, patch) in self._patches.items():
+                self._write(f, offset, patch)
+
+            # Commit
+            self._write(f, 4, array.array('I', (pos,)))
+
+        self._end = pos
+        self.damaged = False
+        self.commits += 1
+        self._clean()
+
+    def _clean(self):
+        self._buf = bytearray()
+        self._patches = {}
+        self._since = None
+        if self in _journals:
+            _journals.remove(self)